@@ -2,14 +2,35 @@ from datetime import datetime
 import time
 from enum import Enum
 import pandas as pd
-from memory_profiler import memory_usage
+import numpy as np
+import itertools
 import os.path
+from Cache import ResultCache, frameFingerprint
+import Concurrency
+import Memory
+import Profiler
+import Results
+import Scaling
+import Startup
+import Streaming
+import Trials
 
 class Criteria(Enum):
     FUNCTIONAL = 0
     RUNTIME = 1
     CPU_RUNTIME = 2
     STORAGE = 3
+    SCALABILITY = 4
+    STREAMING = 5
+    CONCURRENCY = 6
+    STARTUP = 7
+    PROFILE = 8
+
+# criteria measured on every call of the tool, without them Criteria.FUNCTIONAL runs on its own (batched, result cache)
+MEASURED_CRITERIA = {Criteria.RUNTIME, Criteria.CPU_RUNTIME, Criteria.STORAGE, Criteria.PROFILE}
+
+# costs recorded for every method, building and trial in both the single pass and the isolated passes
+METHOD_METRICS = ('runtime', 'cpu_runtime', 'ram_peak', 'ram_avg')
 
 class Benchmark:
     # Class attributes
@@ -20,28 +41,107 @@ class Benchmark:
     ram_avg = 0
     ram_max = 0
 
-    def __init__(self, tool, dataset, criterias , buildings, vm):
+    # isolated: run every criterion in its own pass (old behaviour), e.g. for interference-free memory numbers
+    # warmup, trials: unmeasured and measured drift detection runs per building, every measured run is kept as a sample
+    # memory, memory_options: name and keyword arguments of the memory sampler (see Memory.SAMPLERS)
+    # scaling: sweep of the SCALABILITY criterion, missing keys are taken from Scaling.DEFAULTS
+    # streaming: micro-batches of the STREAMING criterion, missing keys are taken from Streaming.DEFAULTS
+    # concurrency: load of the CONCURRENCY criterion, missing keys are taken from Concurrency.DEFAULTS
+    # startup: calls and reported modules of the STARTUP criterion, missing keys are taken from Startup.DEFAULTS
+    # profile: sampling interval and number of hotspots of the PROFILE criterion, missing keys are taken from Profiler.DEFAULTS
+    # store, run_id: results store and run the drift results and measurements are written to (see Results.py), None for no store
+    # csv_report: also append to the csv reports (benchmark_report.csv, benchmark_samples.csv, the reports of the other criteria)
+    # and write the collapsed stacks of PROFILE
+    # result_cache: Cache.ResultCache the drift results of runFunctional are taken from and stored in, None to always call the tool,
+    # the timed criteria never use it
+    def __init__(self, tool, dataset, criterias , buildings, vm, isolated=False, warmup=0, trials=1, memory='rss', memory_options=None,
+                 scaling=None, streaming=None, concurrency=None, startup=None, profile=None, store=None,
+                 run_id=None, csv_report=True, result_cache=None):
         self.tool = tool
         self.dataset = dataset
         self.criterias = criterias
         self.buildings = buildings
         self.runOnVm = vm
+        self.isolated = isolated
+        self.warmup = warmup
+        self.trials = trials
+        self.memory = memory
+        self.memory_options = memory_options or {}
+        self.building_memory = {}
+        self.scaling = dict(Scaling.DEFAULTS, **(scaling or {}))
+        self.scaling_points = []
+        self.scaling_fits = []
+        self.streaming = dict(Streaming.DEFAULTS, **(streaming or {}))
+        self.streaming_windows = []
+        self.streaming_stats = []
+        self.concurrency = dict(Concurrency.DEFAULTS, **(concurrency or {}))
+        self.concurrency_stats = []
+        self.startup = dict(Startup.DEFAULTS, **(startup or {}))
+        self.startup_stats = {}
+        self.startup_samples = []
+        self.profile_options = dict(Profiler.DEFAULTS, **(profile or {}))
+        self.profile = {}
+        self.store = store
+        self.run_id = run_id
+        self.csv_report = csv_report
+        self.result_cache = result_cache
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.driftDetectionStats = {}
-
-    def runBenchmark(self):
-        for criteria in self.criterias:
-            if criteria == Criteria.FUNCTIONAL:
-                self.runFunctional()
-            elif criteria == Criteria.RUNTIME:
-                self.runRuntime()
-            elif criteria == Criteria.CPU_RUNTIME:
-                self.runCPUruntime()
-            elif criteria == Criteria.STORAGE:
-                self.runStorage()
+        self.measurements = {}
+        self.samples = []
+        self.method_samples = []
+        self.method_index = {}
+        self.method_stats = {}
+        self.runtime_stats = Trials.summarize([])
+        self.runtime_cpu_stats = Trials.summarize([])
+        self.ram_stats = Trials.summarize([])
+
+    # measurements: results of measureTrials per building collected elsewhere (e.g. by the Scheduler), the buildings are not run again
+    def runBenchmark(self, measurements=None):
+        # the cold start is measured in a fresh process, before this process imports the backend
+        if Criteria.STARTUP in self.criterias:
+            self.runStartup()
+
+        # the backend of the tool is imported before measuring, the import is not part of the runtime of the first building
+        self.tool.loadBackend()
+        if measurements is not None:
+            for building_id in self.buildings:
+                self.addMeasurements(building_id, measurements[building_id])
+            self.summarizeMeasurements()
+        elif self.isolated or (Criteria.FUNCTIONAL in self.criterias and not MEASURED_CRITERIA & set(self.criterias)):
+            for criteria in self.criterias:
+                if criteria == Criteria.FUNCTIONAL:
+                    self.runFunctional()
+                elif criteria == Criteria.RUNTIME:
+                    self.runRuntime()
+                elif criteria == Criteria.CPU_RUNTIME:
+                    self.runCPUruntime()
+                elif criteria == Criteria.STORAGE:
+                    self.runStorage()
+                elif criteria == Criteria.PROFILE:
+                    self.runProfile()
+            self.summarizeMethods()
+        elif self.measuresBuildings():
+            self.runSinglePass()
 
         # generate Report
         self.__printReport()
 
+        if Criteria.SCALABILITY in self.criterias:
+            self.runScalability()
+            self.__printScalability()
+        if Criteria.STREAMING in self.criterias:
+            self.runStreaming()
+            self.__printStreaming()
+        if Criteria.CONCURRENCY in self.criterias:
+            self.runConcurrency()
+            self.__printConcurrency()
+
+    # scalability, streaming, concurrency and startup run drift detection on their own, without them it runs per building
+    def measuresBuildings(self):
+        return Criteria.FUNCTIONAL in self.criterias or bool(MEASURED_CRITERIA & set(self.criterias))
+
     def __printReport(self):
         self.driftDetectionStats=pd.DataFrame.from_dict(self.driftDetectionStats)
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -72,12 +172,40 @@ class Benchmark:
 
             print()
         print("==============================")
+        if self.cache_hits or self.cache_misses:
+            print("Result cache: {} hits, {} misses".format(self.cache_hits, self.cache_misses))
         print("Runtime AVG: {:.8f} milliseconds".format(self.runtime_avg))
         print("Runtime MAX: {:.8f} milliseconds".format(self.runtime_max))
         print("CPU Runtime AVG: {:.7f} milliseconds".format(self.runtime_cpu_avg))
         print("CPU Runtime MAX: {:.7f} milliseconds".format(self.runtime_cpu_max))
         print("RAM Usage AVG: {:.7f} MiB".format(self.ram_avg))
         print("RAM Usage MAX: {:.7f} MiB".format(self.ram_max))
+        if self.building_memory:
+            print("RAM above baseline per building ({} sampler, peak/avg in MiB):".format(self.memory))
+            for building_id, memory in self.building_memory.items():
+                print("Gebäude {}: {:.4f}/{:.4f}".format(building_id, memory['peak'], memory['avg']))
+        if self.samples:
+            print("Samples: {} ({} warmup and {} measured runs per building)".format(len(self.samples), self.warmup, self.trials))
+            print("Runtime: " + Trials.formatSummary(self.runtime_stats, 'ms'))
+            print("CPU Runtime: " + Trials.formatSummary(self.runtime_cpu_stats, 'ms'))
+            print("RAM Peak: " + Trials.formatSummary(self.ram_stats, 'MiB'))
+        if self.startup_stats:
+            stats = self.startup_stats
+            print("Startup (median of {} processes): backend import {:.3f} seconds, {:.1f} MiB (RSS after import {:.1f} MiB), process {:.3f} seconds".format(
+                  len(self.startup_samples), stats['import_seconds'], stats['import_rss_mib'], stats['rss_after_import_mib'], stats['process_seconds']))
+            print("First call: {:.4f} ms, later calls median: {:.4f} ms".format(stats['first_call'], stats['later_calls']))
+            for module, self_ms, cumulative_ms in stats['modules']:
+                print("    import {}: {:.1f} ms ({:.1f} ms cumulative)".format(module, self_ms, cumulative_ms))
+        if self.profile:
+            print("Profile hotspots (self samples, share of the method, samples on the stack):")
+            for hotspot in Profiler.hotspots(Profiler.mergeBuildings(self.profile), self.profile_options['top']):
+                print("{} {}: {} ({:.1%}), {}".format(hotspot['method'], hotspot['function'], hotspot['self_samples'],
+                      hotspot['self_share'], hotspot['total_samples']))
+        if self.method_stats:
+            print("Per method (runtime AVG/MAX, CPU runtime AVG/MAX in milliseconds, RAM peak MAX/AVG above baseline in MiB):")
+            for method, stats in self.method_stats.items():
+                print("{}: {:.4f}/{:.4f}, {:.4f}/{:.4f}, {:.4f}/{:.4f}".format(method, stats['runtime_avg'], stats['runtime_max'],
+                      stats['cpu_runtime_avg'], stats['cpu_runtime_max'], stats['ram_peak_max'], stats['ram_avg']))
         print("==============================")
 
         self.__saveReport(current_time=current_time)
@@ -85,7 +213,14 @@ class Benchmark:
     
     def __saveReport(self, current_time):
         self.driftDetectionStats = pd.DataFrame.from_dict(self.driftDetectionStats)
-        column_names = self.tool.column_names
+
+        Trials.dumpSamples(self)
+        if self.profile:
+            self.__saveProfile(current_time)
+        if self.store is not None:
+            self.__storeReport()
+        if not self.csv_report:
+            return
 
         # Append data for each test to the report list
         report_data = []
@@ -113,9 +248,20 @@ class Benchmark:
                     'ram_avg': self.ram_avg,
                     'ram_max': self.ram_max,
                     'run_on_vm': self.runOnVm,
+                    'building_ram_peak': self.building_memory.get(x, {}).get('peak', float('nan')),
+                    'building_ram_avg': self.building_memory.get(x, {}).get('avg', float('nan')),
                 }
-
-                for col in column_names:
+                for key in ('import_seconds', 'import_rss_mib', 'rss_after_import_mib', 'first_call', 'later_calls'):
+                    row_data[f"startup_{key}"] = self.startup_stats.get(key, float('nan'))
+                # costs of this test alone, missing for tests computed together with others (batched)
+                method_stats = self.method_stats.get(test, {})
+                for key in ('runtime_avg', 'runtime_max', 'cpu_runtime_avg', 'cpu_runtime_max', 'ram_peak_max', 'ram_avg'):
+                    row_data[f"method_{key}"] = method_stats.get(key, float('nan'))
+                for prefix, summary in (('runtime', self.runtime_stats), ('cpu_runtime', self.runtime_cpu_stats), ('ram_peak', self.ram_stats)):
+                    for key, value in summary.items():
+                        row_data[f"{prefix}_{key}"] = value
+
+                for col in self.tool.column_names:
                     col_drift_score = f"{col}_drift_score"
                     col_is_drifted = f"{col}_is_drifted"
 
@@ -134,20 +280,463 @@ class Benchmark:
         # Create a DataFrame from the report data
         report_df = pd.DataFrame(report_data)
 
-        if os.path.exists('benchmark_report.csv'):
-            report_df.to_csv('benchmark_report.csv', mode='a', index=False, header=False)
+        if report_data:
+            if os.path.exists('benchmark_report.csv'):
+                report_df.to_csv('benchmark_report.csv', mode='a', index=False, header=False)
+            else:
+                report_df.to_csv('benchmark_report.csv', index=False)
+
+        # every measured run, for comparing the distributions of tools and runs
+        if not self.samples:
+            return
+        samples_df = pd.DataFrame(self.samples)
+        samples_df.insert(0, 'time', current_time)
+        samples_df.insert(1, 'tool', self.tool.name)
+        samples_df.insert(2, 'showReport', self.tool.showReport)
+        if os.path.exists('benchmark_samples.csv'):
+            samples_df.to_csv('benchmark_samples.csv', mode='a', index=False, header=False)
         else:
-            report_df.to_csv('benchmark_report.csv', index=False)
+            samples_df.to_csv('benchmark_samples.csv', index=False)
+
+    # rows of a criterion go to the results store (name) and with csv_report to file_name
+    def __saveRows(self, name, file_name, rows, current_time):
+        if self.store is not None:
+            self.store.addCriterionRows(self.run_id, self.tool.name, self.tool.showReport, name, rows)
+        if not self.csv_report:
+            return
+        df = pd.DataFrame(rows)
+        df.insert(0, 'time', current_time)
+        df.insert(1, 'tool', self.tool.name)
+        df.insert(2, 'showReport', self.tool.showReport)
+        if os.path.exists(file_name):
+            df.to_csv(file_name, mode='a', index=False, header=False)
+        else:
+            df.to_csv(file_name, index=False)
+
+    # samples of every stack and the hotspots of every building and method, with csv_report the collapsed stacks for flamegraphs
+    def __saveProfile(self, current_time):
+        stacks = [{'building': building_id, 'method': method, 'stack': ';'.join(stack), 'samples': count}
+                  for (building_id, method, stack), count in self.profile.items()]
+        self.__saveRows('profile_stacks', 'profile_stacks.csv', stacks, current_time)
+        self.__saveRows('profile_hotspots', 'profile_hotspots.csv', Profiler.hotspots(self.profile, self.profile_options['top']), current_time)
+        if self.csv_report:
+            name = self.tool.name + ("_report" if self.tool.showReport else "")
+            with open("profile_{}.collapsed".format(name), 'w') as f:
+                f.write('\n'.join(Profiler.collapsedStacks(self.profile)) + '\n')
+
+    # drift results in long format, the measurement of every trial and of every method in it
+    def __storeReport(self):
+        for x in self.driftDetectionStats:
+            results = {test: stats for test, stats in self.driftDetectionStats[x].items() if isinstance(stats, (dict, str))}
+            self.store.addResults(self.run_id, self.tool.name, self.tool.showReport, x, results, self.tool.column_names)
+        measurements = [dict(sample, method=Results.ALL_METHODS) for sample in self.samples] + self.method_samples
+        # one import and one first call per process, the later calls of all processes are the warm calls
+        building_id = self.startup_stats.get('building')
+        later = [latency for sample in self.startup_samples for latency in sample['latencies'][1:]]
+        for trial, sample in enumerate(self.startup_samples):
+            measurements.append({'building': building_id, 'trial': trial, 'method': 'startup_import',
+                                 'runtime': sample['import_seconds'] * 1000, 'ram_peak': sample['import_rss_mib']})
+            if sample['latencies']:
+                measurements.append({'building': building_id, 'trial': trial, 'method': 'startup_first_call', 'runtime': sample['latencies'][0]})
+        measurements += [{'building': building_id, 'trial': trial, 'method': 'startup_call', 'runtime': latency}
+                         for trial, latency in enumerate(later)]
+        self.store.addMeasurements(self.run_id, self.tool.name, self.tool.showReport, measurements)
+
+    # cold start of the tool in a clean process with the data of the first building, one process per trial
+    # startup_stats: medians over the processes, the slowest modules of the first process
+    def runStartup(self):
+        building_id = min(self.buildings)
+        ref, cur = self.dataset.splitTrainTest(building_id)
+        self.startup_samples = [Startup.measureStartup(self.tool, ref, cur, building_id, self.startup['calls'], self.startup['modules'])
+                                for trial in range(max(self.trials, 1))]
+        first_calls = [sample['latencies'][0] for sample in self.startup_samples if sample['latencies']]
+        later = [latency for sample in self.startup_samples for latency in sample['latencies'][1:]]
+        stats = {key: float(np.median([sample[key] for sample in self.startup_samples]))
+                 for key in ('import_seconds', 'import_rss_mib', 'rss_after_import_mib', 'process_seconds')}
+        stats['building'] = building_id
+        stats['modules'] = self.startup_samples[0]['modules']
+        stats['first_call'] = float(np.median(first_calls)) if first_calls else float('nan')
+        stats['later_calls'] = float(np.median(later)) if later else float('nan')
+        self.startup_stats = stats
+
+    def __printScalability(self):
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print("==============================")
+        print("Scalability Report: {}".format(self.tool.name + (" with report" if self.tool.showReport else "")))
+        print("Runtime per algorithm in milliseconds, RAM peak above baseline in MiB")
+        for point in self.scaling_points:
+            if point['method'] != 'all':
+                continue
+            if point['failed']:
+                print("{} rows x {} columns: failed ({})".format(point['rows'], point['columns'], point['failed']))
+            else:
+                print("{} rows x {} columns: {:.4f} ms, {:.4f} MiB".format(point['rows'], point['columns'], point['runtime'], point['ram_peak']))
+        print("Complexity exponents (runtime/memory):")
+        for fit in self.scaling_fits:
+            print("{} over {}: {:.2f}/{:.2f}".format(fit['method'], fit['axis'], fit['runtime_exponent'], fit['ram_exponent']))
+        print("==============================")
 
-    def runFunctional(self):
+        self.__saveRows('scalability', 'benchmark_scalability.csv', self.scaling_points, current_time)
+        self.__saveRows('scalability_fit', 'benchmark_scalability_fit.csv', self.scaling_fits, current_time)
+
+    def __printStreaming(self):
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print("==============================")
+        print("Streaming Report: {}".format(self.tool.name + (" with report" if self.tool.showReport else "")))
+        for stats in self.streaming_stats:
+            print("Window of {} rows: {} windows ({} failed), {:.1f} rows/s, memory growth {:.4f} MiB".format(
+                  stats['window'], stats['windows'], stats['failed'], stats['rows_per_second'], stats['memory_growth']))
+            print("Latency: median {:.4f} ms, p90 {:.4f} ms, p99 {:.4f} ms, max {:.4f} ms".format(
+                  stats['latency_median'], stats['latency_p90'], stats['latency_p99'], stats['latency_max']))
+        if self.streaming_stats:
+            stats = self.streaming_stats[0]
+            print("Fixed overhead per call: {:.4f} ms, per row: {:.6f} ms".format(stats['overhead'], stats['per_row']))
+        print("==============================")
+
+        self.__saveRows('streaming', 'benchmark_streaming.csv', self.streaming_stats, current_time)
+        self.__saveRows('streaming_windows', 'benchmark_streaming_windows.csv', self.streaming_windows, current_time)
+
+    def __printConcurrency(self):
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print("==============================")
+        print("Concurrency Report: {}".format(self.tool.name + (" with report" if self.tool.showReport else "")))
+        for stats in self.concurrency_stats:
+            print("{} with {} workers: {:.2f} calls/s (speedup {:.2f}), latency median {:.4f} ms, p99 {:.4f} ms, "
+                  "cpu parallelism {:.2f}, GIL contention {:.2f}".format(
+                  stats['mode'], stats['workers'], stats['throughput'], stats['speedup'], stats['latency_median'],
+                  stats['latency_p99'], stats['parallelism'], stats['gil_contention']))
+            if stats['errors'] or stats['mismatches']:
+                print("    {} calls failed, {} results differ from the serial results".format(stats['errors'], stats['mismatches']))
+        unsafe = [stats for stats in self.concurrency_stats if stats['workers'] > 1 and (stats['errors'] or stats['mismatches'])]
+        print("Thread-safe: {}".format("no" if unsafe else "yes"))
+        print("==============================")
+
+        self.__saveRows('concurrency', 'benchmark_concurrency.csv', self.concurrency_stats, current_time)
+
+    # calls the drift detection of the buildings concurrently on one tool instance, as a service process would,
+    # at every number of workers from a thread pool and from an event loop. Every result is compared with the serial result of
+    # its building, tools that keep per-call state on the instance (self.ref, self.cur) return wrong results or fail
+    def runConcurrency(self):
+        self.tool.loadBackend()
+        self.tool.memorySampler = None
+        buildings = sorted(self.buildings)
+        splits = {building_id: self.dataset.splitTrainTest(building_id) for building_id in buildings}
+
+        # two serial runs per building, results that differ between them (randomized methods) are not compared
+        expected = {}
+        for building_id in buildings:
+            ref, cur = splits[building_id]
+            first = self.tool.runDriftdetection(ref.copy(), cur.copy(), building_id)
+            second = self.tool.runDriftdetection(ref.copy(), cur.copy(), building_id)
+            expected[building_id] = {label: result for label, result in second.items()
+                                     if label in first and Concurrency.sameResult(result, first[label])}
+
+        cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+        for mode in self.concurrency['modes']:
+            mode_stats = []
+            for workers in self.concurrency['workers']:
+                # the tools may change their input in place, every call gets its own copies
+                calls = [(splits[building_id][0].copy(), splits[building_id][1].copy(), building_id)
+                         for building_id in itertools.islice(itertools.cycle(buildings), self.concurrency['calls'])]
+                wall, cpu, outcomes = Concurrency.RUNNERS[mode](self.tool.runDriftdetection, calls, workers)
+
+                errors = 0
+                mismatches = 0
+                for (ref, cur, building_id), (latency, result) in zip(calls, outcomes):
+                    if isinstance(result, Exception):
+                        errors += 1
+                    elif not isinstance(result, dict) or not Concurrency.sameResult(
+                            {label: result.get(label) for label in expected[building_id]}, expected[building_id]):
+                        mismatches += 1
+
+                latency = Trials.summarize([latency for latency, result in outcomes])
+                # cpu time per wall time: close to 1 for code serialized by the GIL, up to the number of workers for code that releases it
+                parallelism = cpu / wall
+                mode_stats.append({'mode': mode, 'workers': workers, 'calls': len(calls), 'throughput': len(calls) / wall,
+                                   'latency_median': latency['median'], 'latency_p90': latency['p90'], 'latency_p99': latency['p99'],
+                                   'parallelism': parallelism, 'gil_contention': max(0.0, 1 - parallelism / min(workers, cpus)),
+                                   'errors': errors, 'mismatches': mismatches})
+
+            # throughput relative to the fewest workers
+            for stats in mode_stats:
+                stats['speedup'] = stats['throughput'] / mode_stats[0]['throughput']
+            self.concurrency_stats.extend(mode_stats)
+
+    # feeds the current set of every building to the tool in micro-batches against the fixed reference set,
+    # records the latency of every window and the resident memory after it
+    def runStreaming(self):
+        self.tool.loadBackend()
+        self.tool.memorySampler = None
+        for size in self.streaming['windows']:
+            window_stats = []
+            for building_id in self.buildings:
+                ref, cur = self.dataset.splitTrainTest(building_id)
+                window = 0
+                for cur_window in Streaming.windows(cur, size, self.streaming['step'], self.streaming['max_windows']):
+                    # the tools may change their input in place (e.g. renaming columns), every window gets its own copies
+                    window_ref = ref.copy(deep=False)
+                    cur_window = cur_window.copy()
+                    failed = ''
+                    st = time.perf_counter()
+                    try:
+                        self.tool.runDriftdetection(window_ref, cur_window, building_id)
+                    except Exception as e:
+                        # some tests need more rows than a small window has
+                        failed = type(e).__name__
+                    latency = (time.perf_counter() - st) * 1000
+                    window_stats.append({'window': size, 'building': building_id, 'index': window, 'rows': len(cur_window),
+                                         'latency': latency, 'rss': Memory.residentMemory(), 'failed': failed})
+                    window += 1
+            self.streaming_windows.extend(window_stats)
+            succeeded = [stats for stats in window_stats if not stats['failed']]
+            if not succeeded:
+                continue
+
+            latencies = [stats['latency'] for stats in succeeded]
+            latency = Trials.summarize(latencies)
+            self.streaming_stats.append({'window': size, 'windows': len(succeeded), 'failed': len(window_stats) - len(succeeded),
+                                         'rows_per_second': sum(stats['rows'] for stats in succeeded) / (sum(latencies) / 1000),
+                                         'latency_median': latency['median'], 'latency_p90': latency['p90'],
+                                         'latency_p99': latency['p99'], 'latency_max': max(latencies),
+                                         'memory_growth': window_stats[-1]['rss'] - window_stats[0]['rss']})
+
+        # fixed overhead per call and cost per row over all window sizes
+        overhead, per_row = Streaming.overheadFit([stats['window'] for stats in self.streaming_stats],
+                                                  [stats['latency_median'] for stats in self.streaming_stats])
+        for stats in self.streaming_stats:
+            stats['overhead'] = overhead
+            stats['per_row'] = per_row
+
+    # replays the tool on resampled reference and current sets of the first building: first the rows at the native number
+    # of columns, then the columns at base_rows rows. A sweep stops at the first point that fails (e.g. out of memory)
+    # or exceeds the time budget, the larger points would only fail or take longer
+    def runScalability(self):
+        self.tool.loadBackend()
+        building_id = min(self.buildings)
+        ref, cur = self.dataset.splitTrainTest(building_id)
+        native_columns = len(Scaling.featureColumns(ref))
+
+        for axis in ('rows', 'columns'):
+            for size in self.scaling[axis]:
+                rows, columns = (size, native_columns) if axis == 'rows' else (self.scaling['base_rows'], size)
+                st = time.time()
+                try:
+                    measurement = self.measure(Scaling.resample(ref, rows, columns, seed=0), Scaling.resample(cur, rows, columns, seed=1),
+                                               building_id, True)
+                except Exception as e:
+                    self.scaling_points.append({'axis': axis, 'size': size, 'rows': rows, 'columns': columns, 'method': 'all',
+                                                'runtime': float('nan'), 'cpu_runtime': float('nan'), 'ram_peak': float('nan'),
+                                                'failed': type(e).__name__})
+                    break
+
+                timings = dict(measurement['method_timings'])
+                timings['all'] = {'runtime': measurement['runtime'], 'cpu_runtime': measurement['cpu_runtime'],
+                                  'ram_peak': measurement['ram']['peak']}
+                for method, timing in timings.items():
+                    self.scaling_points.append({'axis': axis, 'size': size, 'rows': rows, 'columns': columns, 'method': method,
+                                                'runtime': timing['runtime'], 'cpu_runtime': timing['cpu_runtime'],
+                                                'ram_peak': timing['ram_peak'], 'failed': ''})
+                if time.time() - st > self.scaling['budget']:
+                    break
+
+        # exponent of runtime and memory over the size for every method and axis
+        for axis in ('rows', 'columns'):
+            points = [point for point in self.scaling_points if point['axis'] == axis and not point['failed']]
+            for method in dict.fromkeys(point['method'] for point in points):
+                method_points = [point for point in points if point['method'] == method]
+                sizes = [point['size'] for point in method_points]
+                self.scaling_fits.append({'axis': axis, 'method': method, 'points': len(method_points),
+                                          'runtime_exponent': Scaling.complexityExponent(sizes, [point['runtime'] for point in method_points]),
+                                          'ram_exponent': Scaling.complexityExponent(sizes, [point['ram_peak'] for point in method_points])})
+
+    # collects drift results, runtime and cpu runtime from one timed call per building and trial, memory from a second call
+    def runSinglePass(self):
         for building_id in self.buildings:
-            # Split into reference and current dataset
+            self.addMeasurements(building_id, self.measureTrials(building_id))
+        self.summarizeMeasurements()
+
+    # warmup runs are discarded, one measurement per trial is returned
+    def measureTrials(self, building_id):
+        for i in range(self.warmup):
+            self.measureBuilding(building_id)
+        return [self.measureBuilding(building_id) for i in range(self.trials)]
+
+    # measurement of one building, the memory is measured in a second untimed call so the timings are not disturbed by the
+    # sampler threads (polling, nested samplers of the methods)
+    def measureBuilding(self, building_id):
+        self.tool.loadBackend()
+
+        # Split into reference and current dataset
+        ref, cur = self.dataset.splitTrainTest(building_id)
+        measurement = self.measure(ref, cur, building_id, False)
+        if Criteria.STORAGE in self.criterias:
             ref, cur = self.dataset.splitTrainTest(building_id)
+            storage_measurement = self.measure(ref, cur, building_id, True)
+            measurement['ram'] = storage_measurement['ram']
+            for method, timing in storage_measurement['method_timings'].items():
+                if method in measurement['method_timings']:
+                    measurement['method_timings'][method]['ram_peak'] = timing['ram_peak']
+                    measurement['method_timings'][method]['ram_avg'] = timing['ram_avg']
+
+        measurement['column_names'] = self.tool.column_names
+        return measurement
+
+    def addMeasurements(self, building_id, measurements):
+        self.measurements[building_id] = measurements
+        for trial in range(len(measurements)):
+            measurement = measurements[trial]
+            memory = measurement['ram'] or {'peak': float('nan'), 'avg': float('nan')}
+            self.samples.append({'building': building_id, 'trial': trial, 'runtime': measurement['runtime'],
+                                 'cpu_runtime': measurement['cpu_runtime'], 'ram_peak': memory['peak'], 'ram_avg': memory['avg']})
+            self.addMethodTimings(building_id, trial, measurement['method_timings'])
+            self.addProfile(building_id, measurement.get('profile', {}))
+
+        # drift results of the last trial, measurements from worker processes bring the column names of their copy of the tool
+        measurement = measurements[-1]
+        self.tool.column_names = measurement['column_names']
+
+        if Criteria.FUNCTIONAL in self.criterias:
             self.driftDetectionStats[building_id] = {}
+            my_dict = measurement['result']
+            if not my_dict:
+                print("Dict from building {} is empty" .format(building_id))
+            else:
+                self.driftDetectionStats[building_id].update(my_dict)
 
-            # runDriftDetection without report generation
-            my_dict = self.tool.runDriftdetection(ref, cur, building_id)
-            self.ref = ref
+    def addProfile(self, building_id, profile):
+        for (method, stack), count in profile.items():
+            key = (building_id, method, stack)
+            self.profile[key] = self.profile.get(key, 0) + count
+
+    # isolated: one profiled drift detection per building, the sampling does not disturb the runs of the other criteria
+    def runProfile(self):
+        for building_id in self.buildings:
+            ref, cur = self.dataset.splitTrainTest(building_id)
+            self.addProfile(building_id, self.measure(ref, cur, building_id, False)['profile'])
+
+    def summarizeMeasurements(self):
+        runtimes = [sample['runtime'] for sample in self.samples]
+        cpu_runtimes = [sample['cpu_runtime'] for sample in self.samples]
+
+        if Criteria.RUNTIME in self.criterias:
+            self.runtime_avg = sum(runtimes) / len(runtimes)
+            self.runtime_max = max(runtimes)
+            self.runtime_stats = Trials.summarize(runtimes)
+        if Criteria.CPU_RUNTIME in self.criterias:
+            self.runtime_cpu_avg = sum(cpu_runtimes) / len(cpu_runtimes)
+            self.runtime_cpu_max = max(cpu_runtimes)
+            self.runtime_cpu_stats = Trials.summarize(cpu_runtimes)
+        if Criteria.STORAGE in self.criterias:
+            for building_id in self.buildings:
+                self.building_memory[building_id] = self.summarizeMemory([sample for sample in self.samples if sample['building'] == building_id])
+            memory = self.summarizeMemory(self.samples)
+            self.ram_avg = memory['avg']
+            self.ram_max = memory['peak']
+            self.ram_stats = Trials.summarize([sample['ram_peak'] for sample in self.samples])
+        self.summarizeMethods()
+
+    # highest peak and mean average memory above the baseline, samplers without averages (nan) are left out of the mean
+    def summarizeMemory(self, samples):
+        peaks = [sample['ram_peak'] for sample in samples if sample['ram_peak'] == sample['ram_peak']]
+        avgs = [sample['ram_avg'] for sample in samples if sample['ram_avg'] == sample['ram_avg']]
+        return {'peak': max(peaks, default=float('nan')), 'avg': sum(avgs) / len(avgs) if avgs else float('nan')}
+
+    # one row per building, trial and method, the isolated passes each fill in the metrics of their criterion
+    def addMethodTimings(self, building_id, trial, method_timings, metrics=METHOD_METRICS):
+        for method, timing in method_timings.items():
+            key = (building_id, trial, method)
+            sample = self.method_index.get(key)
+            if sample is None:
+                sample = self.method_index[key] = dict(dict.fromkeys(METHOD_METRICS, float('nan')), building=building_id, trial=trial, method=method)
+                self.method_samples.append(sample)
+            sample.update({metric: timing[metric] for metric in metrics})
+
+    # average and maximum costs of every method over all buildings and trials
+    def summarizeMethods(self):
+        self.method_stats = {}
+        for method in dict.fromkeys(sample['method'] for sample in self.method_samples):
+            samples = [sample for sample in self.method_samples if sample['method'] == method]
+            # metrics of criteria that did not run (isolated passes) are nan
+            runtimes = [sample['runtime'] for sample in samples if sample['runtime'] == sample['runtime']]
+            cpu_runtimes = [sample['cpu_runtime'] for sample in samples if sample['cpu_runtime'] == sample['cpu_runtime']]
+            memory = self.summarizeMemory(samples)
+            self.method_stats[method] = {
+                'runtime_avg': sum(runtimes) / len(runtimes) if runtimes else float('nan'),
+                'runtime_max': max(runtimes, default=float('nan')),
+                'cpu_runtime_avg': sum(cpu_runtimes) / len(cpu_runtimes) if cpu_runtimes else float('nan'),
+                'cpu_runtime_max': max(cpu_runtimes, default=float('nan')),
+                'ram_peak_max': memory['peak'],
+                'ram_avg': memory['avg'],
+            }
+
+    def createSampler(self):
+        return Memory.createSampler(self.memory, **self.memory_options)
+
+    # runs drift detection once and measures wall-clock time, cpu time (both in ms per algorithm) and memory usage
+    # (peak and average above the baseline in MiB), the tool records the costs of every method itself, with storage including their memory
+    def measure(self, ref, cur, building_id, storage=True):
+        measurement = {}
+        self.tool.memorySampler = self.createSampler if storage else None
+        self.tool.profiler = None
+        # the stacks are sampled in the timed call, not in the memory call of the same trial
+        if Criteria.PROFILE in self.criterias and not storage:
+            self.tool.profiler = Profiler.SamplingProfiler(self.profile_options['interval'], type(self.tool).runDriftdetection.__code__)
+            self.tool.profiler.start()
+
+        def instrumented():
+            st = time.time()
+            st_cpu = time.process_time()
+            result = self.tool.runDriftdetection(ref, cur, building_id)
+            end_cpu = time.process_time()
+            end = time.time()
+            measurement['runtime'] = ((end - st) / len(self.tool.methods)) * 1000
+            measurement['cpu_runtime'] = ((end_cpu - st_cpu) / len(self.tool.methods)) * 1000
+            return result
+
+        if storage:
+            measurement['result'], measurement['ram'] = Memory.measureMemory(self.createSampler(), instrumented)
+        else:
+            measurement['ram'] = None
+            measurement['result'] = instrumented()
+        measurement['method_timings'] = self.tool.method_timings
+        if self.tool.profiler:
+            measurement['profile'] = self.tool.profiler.stop()
+            self.tool.profiler = None
+
+        return measurement
+
+    # all buildings in one call, tools with a batched implementation (Native) test them in a single pass
+    # buildings with a result in the result cache are not run, tools writing reports (showReport) always run
+    def runFunctional(self):
+        building_ids = list(self.buildings)
+        # Split into reference and current dataset
+        splits = {building_id: self.dataset.splitTrainTest(building_id) for building_id in building_ids}
+        results = {}
+        keys = {}
+        if self.result_cache is not None and not self.tool.showReport:
+            tool_key = self.tool.cacheKey()
+            for building_id, (ref, cur) in splits.items():
+                # the tools may change ref and cur in place, the key is computed before the call
+                keys[building_id] = ResultCache.key(tool_key, building_id, frameFingerprint(ref), frameFingerprint(cur))
+                cached = self.result_cache.get(keys[building_id])
+                if cached is not None:
+                    results[building_id], self.tool.column_names = cached
+            self.cache_hits = len(results)
+            self.cache_misses = len(building_ids) - len(results)
+
+        # runDriftDetection without report generation
+        missing = [building_id for building_id in building_ids if building_id not in results]
+        if missing:
+            computed = self.tool.runDriftdetectionBatched([splits[building_id][0] for building_id in missing],
+                                                          [splits[building_id][1] for building_id in missing], missing)
+            for building_id in missing:
+                results[building_id] = computed[building_id]
+                if building_id in keys:
+                    self.result_cache.put(keys[building_id], (computed[building_id], self.tool.column_names))
+
+        for building_id in building_ids:
+            self.driftDetectionStats[building_id] = {}
+            my_dict = results[building_id]
             if not my_dict:
                 print("Dict from building {} is empty" .format(building_id))
             else:
@@ -169,6 +758,7 @@ class Benchmark:
             # Timestamp after executing, compute runtime in ms, divided by count of algorithms of tool, result: avg runtime of 1 algorithm for 1 building
             runtime_result = ((time.time() - st)/len(self.tool.methods))  * 1000 
             runtime_sum += runtime_result
+            self.addMethodTimings(building_id, 0, self.tool.method_timings, ('runtime',))
 
             # set maximal runtime
             self.runtime_max = max(self.runtime_max, runtime_result)
@@ -191,6 +781,7 @@ class Benchmark:
             end = time.process_time()
             cpu_result = ((end-st) / len(self.tool.methods)) * 1000
             cpu_sum += cpu_result
+            self.addMethodTimings(building_id, 0, self.tool.method_timings, ('cpu_runtime',))
 
             # set maximal cpu
             self.runtime_cpu_max = max(self.runtime_cpu_max, cpu_result)
@@ -199,12 +790,17 @@ class Benchmark:
         self.runtime_cpu_avg = cpu_sum / len(self.buildings) 
 
     def runStorage(self):
-        self.ram_max = 0
-        mem = []
         for building_id in self.buildings:
             ref, cur = self.dataset.splitTrainTest(building_id)
-            mem = mem + memory_usage((self.tool.runDriftdetection, (ref,cur,building_id)))
-
-        # compute average storage
-        self.ram_avg = sum(mem) / len(mem)
-        self.ram_max = max(mem)
\ No newline at end of file
+            self.tool.memorySampler = self.createSampler
+            memory = Memory.measureMemory(self.createSampler(), self.tool.runDriftdetection, ref, cur, building_id)[1]
+            self.tool.memorySampler = None
+            self.building_memory[building_id] = {'peak': memory['peak'], 'avg': memory['avg']}
+
+            # memory of every method, in the rows of the runtime passes
+            self.addMethodTimings(building_id, 0, self.tool.method_timings, ('ram_peak', 'ram_avg'))
+
+        # highest peak and average over the buildings
+        memory = self.summarizeMemory([{'ram_peak': memory['peak'], 'ram_avg': memory['avg']} for memory in self.building_memory.values()])
+        self.ram_avg = memory['avg']
+        self.ram_max = memory['peak']
\ No newline at end of file
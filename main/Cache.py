@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+import pandas as pd # pip install pandas
+
+# size, modification time and content hash of a file, changes whenever the file changes
+def fileFingerprint(path, chunk_size=1 << 20):
+    stat = os.stat(path)
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return "{}_{}_{}".format(stat.st_size, stat.st_mtime_ns, sha.hexdigest()[:16])
+
+# content hash of a DataFrame (column names, index and values)
+def frameFingerprint(df):
+    sha = hashlib.sha1(str(list(df.columns)).encode())
+    sha.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return sha.hexdigest()
+
+# fingerprint of a numpy array: sha1 of shape, dtype and all values, so any changed value gives a new fingerprint
+def arrayFingerprint(arr):
+    flat = np.ascontiguousarray(arr)
+    sha = hashlib.sha1(str((np.shape(arr), flat.dtype.str)).encode())
+    sha.update(flat.tobytes())
+    return sha.hexdigest()
+
+# parquet needs pyarrow or fastparquet, without them the cache falls back to pickle
+def parquetEngine():
+    for engine in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(engine)
+            return engine
+        except ImportError:
+            pass
+    return None
+
+# on-disk cache of a preprocessed dataset, entries are keyed by the fingerprint of the source csv and the preprocessing version
+class DatasetCache:
+
+    def __init__(self, cache_dir, source, version):
+        self.cache_dir = cache_dir
+        name = os.path.splitext(os.path.basename(source))[0]
+        self.key = "{}_{}_{}".format(name, version, fileFingerprint(source))
+        self.engine = parquetEngine()
+
+    def file(self, suffix):
+        return os.path.join(self.cache_dir, self.key + suffix)
+
+    # preprocessed frame in a columnar format (dtypes and index are kept), None if not cached yet
+    def loadFrame(self):
+        if self.engine is not None and os.path.exists(self.file('.parquet')):
+            return pd.read_parquet(self.file('.parquet'), engine=self.engine)
+        return self.loadObject('frame')
+
+    def storeFrame(self, df):
+        if self.engine is None:
+            self.storeObject('frame', df)
+            return
+        writeAtomic(self.file('.parquet'), lambda tmp: df.to_parquet(tmp, engine=self.engine))
+
+    # any other derived object of the dataset, e.g. the train/test split of a building
+    def loadObject(self, name):
+        file_name = self.file('_{}.pkl'.format(name))
+        if os.path.exists(file_name):
+            return pd.read_pickle(file_name)
+        return None
+
+    def storeObject(self, name, obj):
+        writeAtomic(self.file('_{}.pkl'.format(name)), lambda tmp: pd.to_pickle(obj, tmp))
+
+# write to a temporary file first, so parallel runs never read half written entries
+def writeAtomic(file_name, writer):
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    tmp = "{}.{}.tmp".format(file_name, os.getpid())
+    writer(tmp)
+    os.replace(tmp, file_name)
+
+# on-disk cache of drift results, content addressed: the key is the hash of everything a result depends on (tool, versions,
+# settings, methods, reference and current data), so changed inputs never hit old entries
+# the least recently used entries (by modification time, refreshed on every hit) are removed once the cache exceeds max_mb
+class ResultCache:
+
+    def __init__(self, cache_dir, max_mb=256):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 ** 2
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def file(self, key):
+        return os.path.join(self.cache_dir, key + '.pkl')
+
+    def get(self, key):
+        file_name = self.file(key)
+        try:
+            value = pd.read_pickle(file_name)
+            os.utime(file_name)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # entry of an interrupted write or an incompatible version (any error of unpickling, e.g. a missing module)
+            try:
+                os.remove(file_name)
+            except OSError:
+                pass
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        writeAtomic(self.file(key), lambda tmp: pd.to_pickle(value, tmp))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue # removed by a parallel run
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+# in-memory cache that evicts the least recently used entries once max_entries or the memory budget max_bytes is exceeded
+class LRUCache:
+
+    def __init__(self, max_entries=8, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    # size: (estimated) memory of the value in bytes, counted against max_bytes
+    def put(self, key, value, size=0):
+        if key in self.entries:
+            self.bytes -= self.sizes[key]
+        self.entries[key] = value
+        self.sizes[key] = size
+        self.bytes += size
+        self.entries.move_to_end(key)
+        while self.entries and (len(self.entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            evicted, _ = self.entries.popitem(last=False)
+            self.bytes -= self.sizes.pop(evicted)
+            self.evictions += 1
@@ -0,0 +1,126 @@
+# compares the measurements of a candidate run with a baseline run of the results store, e.g. after upgrading a tool:
+#   python3 main/Compare.py previous latest
+#   python3 main/Compare.py --threshold 0.1 3f2c1a 9b7e44
+#   python3 main/Compare.py --fail-on missing previous latest
+# runs are given by their run_id (or a unique prefix of it), 'latest' or 'previous'
+# exit code 1 if any tool, method and building got significantly slower or uses significantly more memory, 2 if no
+# regression was found but a verdict of --fail-on was (by default: some of the baseline is missing in the candidate or has
+# too few samples to reach significance)
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd # pip install pandas
+from scipy import special, stats # pip install scipy
+import Results
+
+METRICS = ['runtime', 'cpu_runtime', 'ram_peak']
+KEYS = ['tool', 'show_report', 'method', 'building']
+# verdicts besides regression that fail the comparison by default
+FAIL_ON = ['missing', 'too few samples']
+
+def resolveRun(store, run):
+    run_ids = list(store.runs()['run_id'])
+    if run in ('latest', 'previous'):
+        index = -1 if run == 'latest' else -2
+        if len(run_ids) < -index:
+            raise ValueError("the store has only {} runs".format(len(run_ids)))
+        return run_ids[index]
+    matches = [run_id for run_id in run_ids if run_id.startswith(run)]
+    if len(matches) != 1:
+        raise ValueError("{} runs match '{}'".format(len(matches), run))
+    return matches[0]
+
+# smallest two-sided p-value of the exact Mann-Whitney U test, reached if all samples of one run are below the other
+def minPvalue(n, m):
+    return min(1.0, 2 / special.comb(n + m, n))
+
+# the samples of every metric per tool, method and building of both runs are compared with a Mann-Whitney U test (exact
+# for small samples without ties)
+# regression: the candidate median is more than threshold (relative) above the baseline median and the difference is
+# significant at alpha, improvement vice versa
+# missing: measured in the baseline but not in the candidate, too few samples: even completely separated samples would not
+# be significant at alpha (e.g. 3 against 3 trials at 0.05)
+def compareRuns(baseline, candidate, alpha=0.05, threshold=0.05, metrics=METRICS):
+    rows = []
+    candidate_groups = dict(list(candidate.groupby(KEYS)))
+    for key, baseline_group in baseline.groupby(KEYS):
+        candidate_group = candidate_groups.get(key, baseline_group.iloc[:0])
+        for metric in metrics:
+            x = baseline_group[metric].dropna().to_numpy(dtype=float)
+            y = candidate_group[metric].dropna().to_numpy(dtype=float)
+            if len(x) == 0:
+                continue
+            baseline_median = float(np.median(x))
+            if len(y) == 0:
+                rows.append(dict(zip(KEYS, key), metric=metric, baseline=baseline_median, candidate=np.nan, change=np.nan,
+                                 p_value=np.nan, n_baseline=len(x), n_candidate=0, verdict='missing'))
+                continue
+            candidate_median = float(np.median(y))
+            p_value = float(stats.mannwhitneyu(x, y, alternative='two-sided', method='auto').pvalue)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                change = candidate_median / baseline_median - 1 if baseline_median else np.nan
+
+            verdict = ''
+            if minPvalue(len(x), len(y)) >= alpha:
+                verdict = 'too few samples'
+            elif p_value < alpha and change > threshold:
+                verdict = 'regression'
+            elif p_value < alpha and change < -threshold:
+                verdict = 'improvement'
+            rows.append(dict(zip(KEYS, key), metric=metric, baseline=baseline_median, candidate=candidate_median, change=change,
+                             p_value=p_value, n_baseline=len(x), n_candidate=len(y), verdict=verdict))
+
+    return pd.DataFrame(rows, columns=KEYS + ['metric', 'baseline', 'candidate', 'change', 'p_value', 'n_baseline',
+                                              'n_candidate', 'verdict'])
+
+def printDiff(diff, baseline_id, candidate_id):
+    print("==============================")
+    print("Baseline: {}, Candidate: {}".format(baseline_id, candidate_id))
+    if diff.empty:
+        print("No common tool, method and building")
+    else:
+        table = diff.sort_values(['verdict', 'tool', 'method', 'building', 'metric'], ascending=[False, True, True, True, True])
+        table = table.assign(change=table['change'].map("{:+.1%}".format), p_value=table['p_value'].map("{:.4f}".format),
+                             baseline=table['baseline'].map("{:.4f}".format), candidate=table['candidate'].map("{:.4f}".format))
+        print(table.drop(columns=['n_baseline', 'n_candidate']).to_string(index=False))
+    counts = diff['verdict'].value_counts()
+    print("Regressions: {}, Improvements: {}, Missing: {}, Too few samples: {}".format(
+          counts.get('regression', 0), counts.get('improvement', 0), counts.get('missing', 0), counts.get('too few samples', 0)))
+    if counts.get('too few samples', 0):
+        print("Warning: some samples are too small to be significant at alpha, rerun with more trials")
+    print("==============================")
+
+# 1 for a regression, 2 for any verdict of fail_on, 0 otherwise
+def exitCode(diff, fail_on=FAIL_ON):
+    if (diff['verdict'] == 'regression').any():
+        return 1
+    return 2 if diff['verdict'].isin(fail_on).any() else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the runtime and memory of two benchmark runs")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'results.db'))
+    parser.add_argument('--alpha', type=float, default=0.05, help="significance level of the Mann-Whitney U test")
+    parser.add_argument('--threshold', type=float, default=0.05, help="relative change of the median that counts")
+    parser.add_argument('--metrics', default=','.join(METRICS))
+    parser.add_argument('--fail-on', default=','.join(FAIL_ON),
+                        help="verdicts besides regression that give exit code 2 ('missing', 'too few samples'), empty for none")
+    args = parser.parse_args(argv)
+
+    store = Results.ResultStore(args.db)
+    try:
+        baseline_id = resolveRun(store, args.baseline)
+        candidate_id = resolveRun(store, args.candidate)
+        baseline = store.measurements(run_id=baseline_id)
+        candidate = store.measurements(run_id=candidate_id)
+    finally:
+        store.close()
+
+    diff = compareRuns(baseline, candidate, args.alpha, args.threshold, args.metrics.split(','))
+    printDiff(diff, baseline_id, candidate_id)
+    return exitCode(diff, [verdict for verdict in args.fail_on.split(',') if verdict])
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import math
+import time
+import numpy as np
+
+# default load of the CONCURRENCY criterion, see Benchmark.runConcurrency
+# workers: numbers of concurrent workers, calls: drift detection calls per level (cycling through the buildings),
+# modes: 'threads' for a thread pool, 'asyncio' for run_in_executor of an event loop (as in an async web service)
+DEFAULTS = {'workers': [1, 2, 4, 8], 'calls': 32, 'modes': ['threads', 'asyncio']}
+
+# one call with its latency (ms) inside the worker, exceptions are returned so one failing call does not stop the others
+def timedCall(function, args):
+    st = time.perf_counter()
+    try:
+        result = function(*args)
+    except Exception as e:
+        result = e
+    return (time.perf_counter() - st) * 1000, result
+
+# runs all calls on a pool of workers threads, returns wall time (s), process cpu time (s) and (latency, result) of every call
+def runThreads(function, calls, workers):
+    st = time.perf_counter()
+    st_cpu = time.process_time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(lambda args: timedCall(function, args), calls))
+    return time.perf_counter() - st, time.process_time() - st_cpu, outcomes
+
+# the same calls submitted from an event loop to an executor with workers threads
+def runAsyncio(function, calls, workers):
+    async def submit():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return await asyncio.gather(*[loop.run_in_executor(executor, timedCall, function, args) for args in calls])
+
+    st = time.perf_counter()
+    st_cpu = time.process_time()
+    outcomes = asyncio.run(submit())
+    return time.perf_counter() - st, time.process_time() - st_cpu, outcomes
+
+RUNNERS = {'threads': runThreads, 'asyncio': runAsyncio}
+
+# compares the drift results of a concurrent call with the serial result of the same building
+def sameResult(result, expected, rel_tol=1e-9):
+    if isinstance(expected, dict):
+        return isinstance(result, dict) and result.keys() == expected.keys() and \
+            all(sameResult(result[key], expected[key], rel_tol) for key in expected)
+    if isinstance(expected, np.ndarray) or isinstance(result, np.ndarray):
+        result, expected = np.asarray(result), np.asarray(expected)
+        if result.shape != expected.shape:
+            return False
+        if result.dtype.kind in 'fc' or expected.dtype.kind in 'fc':
+            return bool(np.allclose(result, expected, rtol=rel_tol, atol=0, equal_nan=True))
+        return bool(np.array_equal(result, expected))
+    if isinstance(expected, float) and isinstance(result, (float, int)):
+        if math.isnan(expected):
+            return math.isnan(result)
+        return math.isclose(result, expected, rel_tol=rel_tol)
+    return result == expected
@@ -1,22 +1,43 @@
 import pandas as pd # pip install pandas
-import numpy as np # pip install pandas
+from Cache import DatasetCache
 
 class Dataset:
-     
-    def __init__(self, path):
+    # increase when preprocess() changes, so cached frames of older versions are not used anymore
+    version = 1
+
+    # cache_dir: optional folder where the preprocessed dataset is cached, None reads and preprocesses the csv on every start
+    def __init__(self, path, cache_dir=None):
+        self.path = path
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = DatasetCache(cache_dir, path, "{}_v{}".format(type(self).__name__, self.version))
+            self.df = self.cache.loadFrame()
+            if self.df is not None:
+                self.prepare()
+                return
+
         self.df = pd.read_csv(path)
+        self.preprocess()
+        if self.cache is not None:
+            self.cache.storeFrame(self.df)
+        self.prepare()
 
     def preprocess(self):
         pass
+
+    # builds in-memory structures on top of the preprocessed df, runs for fresh and cached frames
+    def prepare(self):
+        pass
     
     def splitTrainTest(self, building_id):
         pass
     
 class Data_Energy(Dataset):
+    boundary = '04-01-2020 00:00'
 
-    def __init__(self, path):
-        super().__init__(path)
-        self.preprocess()
+    # cache_dir: optional folder where the preprocessed df and the hourly train/test frames of each building are stored on disk
+    def __init__(self, path, cache_dir=None):
+        super().__init__(path, cache_dir)
 
     def preprocess(self):
         df = self.df
@@ -48,65 +69,84 @@ class Data_Energy(Dataset):
         
         self.df = df
 
+    # one groupby over all buildings and hourly buckets instead of filtering and resampling the whole df per building
+    def prepare(self):
+        df = self.df
+        self.hourly = df.groupby([df['ids'].rename('building'), pd.Grouper(key='time', freq='h')]).sum()
+        self.buildingCache = {}
+
+    # hourly sums of one building taken from the precomputed groupby
+    def buildingGroup(self, building_id):
+        if building_id not in self.hourly.index.levels[0]:
+            return self.hourly.iloc[:0].droplevel('building')
+        return self.hourly.xs(building_id, level='building')
+
     def splitTrainTest(self, building_id):
-        df_group = self.createGroup(building_id)
-        boundary ='04-01-2020 00:00'
-
-        # Split dataset into train and test 
-        train_set = df_group.loc[(df_group['time'] < boundary)]
-        train_set = train_set.set_index("time")
-        train_set.index = pd.to_datetime(train_set.index)
-        train_set = train_set.groupby(pd.Grouper(freq="h")).sum()
-
-        test_set = df_group.loc[df_group['time'] >= boundary]
-        test_set = test_set.set_index("time")
-        test_set.index = pd.to_datetime(test_set.index)
-        test_set = test_set.groupby(pd.Grouper(freq="h")).sum()
-        
+        if building_id not in self.buildingCache:
+            self.buildingCache[building_id] = self.loadSplit(building_id)
+        train_set, test_set = self.buildingCache[building_id]
+
+        # tools modify the frames in place, so every caller gets its own copy
+        return train_set.copy(), test_set.copy()
+
+    # serves the split from the on-disk cache if there is one, otherwise computes (and stores) it
+    # the boundary is part of the name, splits of another boundary are not served
+    def loadSplit(self, building_id):
+        boundary = pd.Timestamp(self.boundary)
+        name = "building_{}_{}".format(building_id, boundary.strftime('%Y%m%dT%H%M%S'))
+        if self.cache is not None:
+            split = self.cache.loadObject(name)
+            if split is not None:
+                return split
+
+        df_group = self.buildingGroup(building_id)
+
+        # Split dataset into train and test, hours without measurements are filled with 0 like pd.Grouper does
+        train_set = df_group.loc[df_group.index < boundary].asfreq('h', fill_value=0)
+        test_set = df_group.loc[df_group.index >= boundary].asfreq('h', fill_value=0)
+
+        if self.cache is not None:
+            self.cache.storeObject(name, (train_set, test_set))
+
         return train_set, test_set
     
     def returnBuilding(self, building_id):
-        df_group = self.createGroup(building_id)
-        df_group = df_group.set_index("time")
-        df_group.index = pd.to_datetime(df_group.index)
-        df_group = df_group.groupby(pd.Grouper(freq="h")).sum()
-        
-        return df_group
-    
-    def createGroup(self, building_id):
-        df = self.df
-        df_group = df[df['ids'] == building_id]
-        num_wrongs = np.sum(df_group['consumption'] < 0)
-        if num_wrongs:
-            df_group.loc[df_group['consumption'] < 0, "consumption"] = np.nan # if there are values <0, they are stated as nan
-            df_group["consumption"] = df_group["consumption"].interpolate() # and linear interpolated
-        return df_group
+        return self.buildingGroup(building_id).asfreq('h', fill_value=0)
 
 class Data_Occupacy(Dataset):
+    # preprocess() keeps the rows sorted by a DatetimeIndex since version 2
+    version = 2
+    boundary = '05-09-2021 00:00'
 
-    def __init__(self, path):
-        super().__init__(path)
-        self.preprocess()
+    # cache_dir: optional folder where the preprocessed df is stored on disk
+    def __init__(self, path, cache_dir=None):
+        super().__init__(path, cache_dir)
 
     def preprocess(self):
         df = self.df
         if 'time' in df:
-            # convert to datetime
+            # convert to datetime once and keep the rows sorted by time, splits are then found by binary search
             df['time'] = pd.to_datetime(df['time'])
+            df = df.set_index('time')
+            if not df.index.is_monotonic_increasing:
+                df = df.sort_index(kind='mergesort')
 
         #self.df = self.df.drop(columns=['Unnamed: 0'], axis=1)
+        self.df = df
 
     def splitTrainTest(self, building_id):
-        df_group = self.df
-        df_group['time'] = pd.to_datetime(df_group['time'])
-        boundary = pd.to_datetime('05-09-2021 00:00')
-
-        train_set = df_group.loc[(df_group['time'] < boundary)]
-        train_set = train_set.set_index("time")
-        train_set.index = pd.to_datetime(train_set.index)
-
-        test_set = df_group.loc[df_group['time'] >= boundary]
-        test_set = test_set.set_index("time")
-        test_set.index = pd.to_datetime(test_set.index)
+        train_set, test_set = self.splitAt(self.boundary)
+        return train_set, test_set
 
-        return train_set, test_set
\ No newline at end of file
+    # slices of the sorted df between consecutive boundaries (no copies): rows < boundaries[0], ..., rows >= boundaries[-1]
+    def splitAt(self, *boundaries):
+        positions = [self.df.index.searchsorted(pd.Timestamp(boundary), side='left') for boundary in boundaries]
+        starts = [0] + list(positions)
+        ends = list(positions) + [len(self.df)]
+        return [self.df.iloc[start:end] for start, end in zip(starts, ends)]
+
+    # rows with start <= time < end, open ends if start or end is None
+    def window(self, start=None, end=None):
+        first = 0 if start is None else self.df.index.searchsorted(pd.Timestamp(start), side='left')
+        last = len(self.df) if end is None else self.df.index.searchsorted(pd.Timestamp(end), side='left')
+        return self.df.iloc[first:last]
@@ -0,0 +1,135 @@
+import threading
+import sys
+import tracemalloc
+import psutil # pip install psutil
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, the maxrss sampler can not be used there
+    resource = None
+
+MIB = 1024 ** 2
+
+# memory samplers by name, selected in main.py
+SAMPLERS = {}
+
+# tracemalloc samplers that are currently running, nested samplers pass their peaks to the enclosing ones
+tracemalloc_active = []
+
+def registerSampler(name):
+    def register(cls):
+        SAMPLERS[name] = cls
+        return cls
+    return register
+
+def createSampler(name, **kwargs):
+    return SAMPLERS[name](**kwargs)
+
+# resident memory of the process in MiB
+def residentMemory():
+    return psutil.Process().memory_info().rss / MIB
+
+# memory of one call: baseline before the call, peak and average during the call minus the baseline (all in MiB)
+def measureMemory(sampler, function, *args):
+    sampler.start()
+    try:
+        result = function(*args)
+    finally:
+        memory = sampler.stop()
+    return result, memory
+
+class MemorySampler:
+
+    def start(self):
+        pass
+
+    # returns {'baseline', 'peak', 'avg'} in MiB, peak and avg are relative to the baseline
+    def stop(self):
+        pass
+
+# resident memory of the process polled by a background thread, sees allocations of native libraries (numpy, tensorflow)
+# interval: seconds between two samples, spikes shorter than the interval can be missed
+@registerSampler('rss')
+class RSSSampler(MemorySampler):
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.process = psutil.Process()
+
+    def start(self):
+        self.baseline = self.process.memory_info().rss
+        self.peak = self.baseline
+        self.total = 0
+        self.count = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.poll, daemon=True)
+        self.thread.start()
+
+    def poll(self):
+        while True:
+            self.sample()
+            if self.stopped.wait(self.interval):
+                return
+
+    def sample(self):
+        rss = self.process.memory_info().rss
+        self.peak = max(self.peak, rss)
+        self.total += rss
+        self.count += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        # the last sample is taken after the call, short calls get at least the samples before and after
+        self.sample()
+        return {'baseline': self.baseline / MIB, 'peak': (self.peak - self.baseline) / MIB,
+                'avg': (self.total / self.count - self.baseline) / MIB}
+
+# python heap allocations traced by tracemalloc, exact peaks but slows down allocations and misses native memory
+# that is not reported to tracemalloc
+@registerSampler('tracemalloc')
+class TracemallocSampler(MemorySampler):
+
+    def start(self):
+        self.started = not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start()
+        # resetting the peak would lose the peak of enclosing samplers, so they take it over first
+        for sampler in tracemalloc_active:
+            sampler.peak = max(sampler.peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self.baseline = tracemalloc.get_traced_memory()[0]
+        self.peak = self.baseline
+        tracemalloc_active.append(self)
+
+    def stop(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        self.peak = max(self.peak, peak)
+        tracemalloc_active.remove(self)
+        for sampler in tracemalloc_active:
+            sampler.peak = max(sampler.peak, self.peak)
+        if self.started:
+            tracemalloc.stop()
+        # tracemalloc only knows the peak, there is no average
+        return {'baseline': self.baseline / MIB, 'peak': (self.peak - self.baseline) / MIB, 'avg': float('nan')}
+
+# growth of the maximum resident memory of the process, no overhead during the call,
+# but a call below an earlier maximum reports 0
+@registerSampler('maxrss')
+class MaxRSSSampler(MemorySampler):
+
+    def __init__(self):
+        if resource is None:
+            raise RuntimeError("the maxrss sampler needs the resource module (not available on this platform)")
+
+    # ru_maxrss is in KiB on linux and in bytes on macOS
+    def maxrss(self):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+    def start(self):
+        self.baseline = self.maxrss()
+
+    def stop(self):
+        return {'baseline': self.baseline / MIB, 'peak': (self.maxrss() - self.baseline) / MIB, 'avg': float('nan')}
@@ -0,0 +1,90 @@
+from collections import Counter
+import os
+import sys
+import threading
+
+# default of the PROFILE criterion, see Benchmark.measure
+# interval: seconds between two samples of the profiled thread, top: number of hotspots reported per method
+DEFAULTS = {'interval': 0.005, 'top': 10}
+
+# method of samples taken outside of Tool.timeMethod (preprocessing, batched tools)
+NO_METHOD = 'all'
+
+# function, file and first line of a frame, lines of the same function are merged
+def frameName(frame):
+    code = frame.f_code
+    return "{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno).replace(';', ',')
+
+# samples the stack of the thread that started it from a background thread (sys._current_frames), the profiled code runs
+# unmodified, so the overhead is one stack walk per interval
+# root: code object of the profiled function, frames below it (the benchmark) are cut off
+class SamplingProfiler:
+
+    def __init__(self, interval=0.005, root=None):
+        self.interval = interval
+        self.root = root
+        # set by Tool.timeMethod while a method runs
+        self.method = None
+        self.stacks = Counter()
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.sample(frame)
+
+    def sample(self, frame):
+        method = self.method or NO_METHOD
+        stack = []
+        while frame is not None:
+            stack.append(frameName(frame))
+            if frame.f_code is self.root:
+                break
+            frame = frame.f_back
+        if self.root is not None and frame is None:
+            # sampled before or after the profiled function
+            return
+        self.stacks[(method, tuple(reversed(stack)))] += 1
+
+    # returns the number of samples of every (method, stack)
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return dict(self.stacks)
+
+# samples of all buildings together
+def mergeBuildings(profile):
+    merged = Counter()
+    for (building_id, method, stack), count in profile.items():
+        merged[('all', method, stack)] += count
+    return merged
+
+# collapsed stacks (one line per stack with its count) as read by flamegraph.pl, speedscope and inferno,
+# profile: samples by (building, method, stack), building and method are the two root frames
+def collapsedStacks(profile):
+    return ["Gebäude {};{};{} {}".format(building_id, method, ';'.join(stack), count)
+            for (building_id, method, stack), count in sorted(profile.items(), key=lambda item: item[0][:2])]
+
+# functions with the most samples per building and method: self samples (the function itself was running)
+# and total samples (the function was on the stack)
+def hotspots(profile, top=10):
+    groups = {}
+    for (building_id, method, stack), count in profile.items():
+        group = groups.setdefault((building_id, method), {'samples': 0, 'self': Counter(), 'total': Counter()})
+        group['samples'] += count
+        group['self'][stack[-1]] += count
+        for function in set(stack):
+            group['total'][function] += count
+
+    rows = []
+    for (building_id, method), group in groups.items():
+        for function, self_samples in group['self'].most_common(top):
+            rows.append({'building': building_id, 'method': method, 'function': function, 'self_samples': self_samples,
+                         'total_samples': group['total'][function], 'self_share': self_samples / group['samples']})
+    return rows
@@ -0,0 +1,174 @@
+import json
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import uuid
+from datetime import datetime
+import numpy as np
+import pandas as pd # pip install pandas
+
+# long format: one row per (run, tool, building, method, column) for the drift results and one row per
+# (run, tool, building, trial, method) for the measurements, so every tool writes the same columns
+# the rows of the other criteria (scalability points, streaming windows, ...) differ per criterion and are kept as json by name
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started TEXT NOT NULL,
+    git_hash TEXT,
+    host TEXT,
+    platform TEXT,
+    python TEXT,
+    cpus INTEGER,
+    run_on_vm INTEGER,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    tool TEXT NOT NULL,
+    show_report INTEGER NOT NULL,
+    building INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    score REAL,
+    is_drifted REAL,
+    detail TEXT
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    tool TEXT NOT NULL,
+    show_report INTEGER NOT NULL,
+    building INTEGER NOT NULL,
+    trial INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    runtime REAL,
+    cpu_runtime REAL,
+    ram_peak REAL,
+    ram_avg REAL
+);
+CREATE TABLE IF NOT EXISTS criteria (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    tool TEXT NOT NULL,
+    show_report INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS results_tool ON results(tool, method, building);
+CREATE INDEX IF NOT EXISTS measurements_run ON measurements(run_id);
+CREATE INDEX IF NOT EXISTS measurements_tool ON measurements(tool, method, building);
+CREATE INDEX IF NOT EXISTS criteria_run ON criteria(run_id, name);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started);
+"""
+
+# method name of the measurement of the whole drift detection call (all methods)
+ALL_METHODS = 'all'
+
+# column name of results that are computed over all columns (e.g. Spot-the-diff)
+ALL_COLUMNS = 'all'
+
+def gitHash():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# numeric value of a drift score or decision, None for results without one (e.g. 'no result'),
+# the drift decision of NannyML is the share of drifted chunks ("12.5 % drifted")
+def numericValue(value):
+    if value is None or isinstance(value, str):
+        if isinstance(value, str) and value.endswith('% drifted'):
+            return float(value.split()[0]) / 100
+        return None
+    value = np.asarray(value, dtype=float)
+    if value.size != 1:
+        return None
+    return float(value.reshape(-1)[0])
+
+# numpy scalars of the criteria rows as python values
+def jsonValue(value):
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+def detailText(score, is_drifted):
+    if numericValue(score) is not None and numericValue(is_drifted) is not None:
+        return None
+    return json.dumps({'score': str(score), 'is_drifted': str(is_drifted)})
+
+# append-only SQLite store of all benchmark runs
+class ResultStore:
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # readers (e.g. a notebook) do not block the benchmark writing its results
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    # registers a new run with the git hash and host of this execution, returns its run_id
+    # config: settings of the run (tools, criteria, ...), stored as json
+    def startRun(self, run_on_vm=False, config=None):
+        run_id = uuid.uuid4().hex
+        with self.connection:
+            self.connection.execute('INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                run_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), gitHash(), socket.gethostname(), platform.platform(),
+                sys.version.split()[0], os.cpu_count(), int(run_on_vm), json.dumps(config or {}, default=str)))
+        return run_id
+
+    # drift results of one building: {method: {f"{col}_drift_score", f"{col}_is_drifted"}} or {method: {'drift_score', 'is_drifted'}}
+    def addResults(self, run_id, tool, show_report, building_id, results, column_names):
+        rows = []
+        for method, stats in results.items():
+            if not isinstance(stats, dict):
+                rows.append((run_id, tool, int(show_report), int(building_id), method, ALL_COLUMNS, None, None,
+                             json.dumps({'result': str(stats)})))
+                continue
+            if 'drift_score' in stats or 'is_drifted' in stats:
+                columns = [(ALL_COLUMNS, stats.get('drift_score'), stats.get('is_drifted'))]
+            else:
+                columns = [(col, stats.get(f"{col}_drift_score"), stats.get(f"{col}_is_drifted")) for col in column_names]
+            for col, score, is_drifted in columns:
+                rows.append((run_id, tool, int(show_report), int(building_id), method, col, numericValue(score),
+                             numericValue(is_drifted), detailText(score, is_drifted)))
+        with self.connection:
+            self.connection.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    # measurements: dicts with building, trial, method, runtime, cpu_runtime, ram_peak and ram_avg
+    def addMeasurements(self, run_id, tool, show_report, measurements):
+        rows = [(run_id, tool, int(show_report), int(m['building']), int(m['trial']), m['method'], numericValue(m.get('runtime')),
+                 numericValue(m.get('cpu_runtime')), numericValue(m.get('ram_peak')), numericValue(m.get('ram_avg')))
+                for m in measurements]
+        with self.connection:
+            self.connection.executemany('INSERT INTO measurements VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    # rows of one criterion, e.g. name='scalability' with the dicts of Benchmark.scaling_points
+    def addCriterionRows(self, run_id, tool, show_report, name, rows):
+        with self.connection:
+            self.connection.executemany('INSERT INTO criteria VALUES (?, ?, ?, ?, ?)',
+                                        [(run_id, tool, int(show_report), name, json.dumps(row, default=jsonValue)) for row in rows])
+
+    def runs(self):
+        return pd.read_sql('SELECT * FROM runs ORDER BY started, rowid', self.connection)
+
+    # drift results joined with their run, filtered by e.g. run_id='...', tool='NannyML', method='K-S Test'
+    def results(self, **filters):
+        return self.query('results', filters)
+
+    def measurements(self, **filters):
+        return self.query('measurements', filters)
+
+    # rows of one criterion with one column per key of the rows
+    def criterionRows(self, name, **filters):
+        df = self.query('criteria', dict(filters, name=name)).reset_index(drop=True)
+        rows = pd.DataFrame([json.loads(data) for data in df['data']], index=df.index)
+        return pd.concat([df.drop(columns=['data']), rows], axis=1)
+
+    def query(self, table, filters):
+        where = ''.join(' AND t.{} = ?'.format(key) for key in filters)
+        return pd.read_sql('SELECT r.started, r.git_hash, r.host, t.* FROM {} t JOIN runs r USING (run_id) WHERE 1 = 1{}'.format(table, where),
+                           self.connection, params=list(filters.values()))
+
+    def close(self):
+        self.connection.close()
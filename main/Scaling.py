@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd # pip install pandas
+
+# default sweep of the SCALABILITY criterion, see Benchmark.runScalability
+# rows: row counts of reference and current set at the native number of columns
+# columns: numbers of feature columns at base_rows rows
+# budget: seconds a point may take, larger points of the sweep are skipped after the first slower or failed point
+DEFAULTS = {'rows': [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7], 'columns': [2, 8, 32, 128, 256],
+            'base_rows': 1000, 'budget': 300}
+
+# columns the tools drop before testing, they are resampled with the rows but never multiplied
+META_COLUMNS = ['ids', 'predicted', 'prob_predicted']
+
+# synthetic version of a reference or current set with the given number of rows and feature columns
+# rows are drawn without replacement (in time order) when downsampling and with replacement when upsampling,
+# additional feature columns are copies of the existing ones with their own row draws so they are not identical
+def resample(df, rows, columns=None, seed=0):
+    rng = np.random.default_rng(seed)
+    features = featureColumns(df)
+    if columns is None:
+        columns = len(features)
+
+    if rows <= len(df):
+        positions = np.sort(rng.choice(len(df), rows, replace=False))
+    else:
+        positions = rng.integers(0, len(df), rows)
+    sampled = df.iloc[positions]
+
+    data = {}
+    for col in df.columns:
+        if col in META_COLUMNS or col in features[:columns]:
+            data[col] = sampled[col].to_numpy()
+    for j in range(len(features), columns):
+        col = features[j % len(features)]
+        data["{}_{}".format(col, j)] = df[col].to_numpy()[rng.integers(0, len(df), rows)]
+
+    return pd.DataFrame(data, index=scaledIndex(df.index, rows))
+
+def featureColumns(df):
+    return [col for col in df.columns if col not in META_COLUMNS]
+
+# evenly spaced index with the frequency of the original, the tools use the (datetime) index as time column
+def scaledIndex(index, rows):
+    if not isinstance(index, pd.DatetimeIndex):
+        return pd.RangeIndex(rows)
+    step = index[1] - index[0] if len(index) > 1 else pd.Timedelta('1h')
+    return pd.date_range(index[0], periods=rows, freq=step)
+
+# empirical complexity exponent: slope of log(value) over log(size), e.g. 1 for linear and 2 for quadratic growth
+# returns nan if less than two valid points are left
+def complexityExponent(sizes, values):
+    sizes = np.asarray(sizes, dtype=float)
+    values = np.asarray(values, dtype=float)
+    valid = (sizes > 0) & (values > 0) & np.isfinite(values)
+    if np.count_nonzero(valid) < 2:
+        return np.nan
+    return float(np.polyfit(np.log(sizes[valid]), np.log(values[valid]), 1)[0])
@@ -0,0 +1,54 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
+
+# benchmarks of the worker process, set once per worker by initWorker
+worker_benchmarks = []
+
+# cpus: cpu ids the workers are pinned to (one cpu per worker, round robin), None for no pinning
+def initWorker(benchmarks, cpus, counter):
+    global worker_benchmarks
+    worker_benchmarks = benchmarks
+    if cpus:
+        with counter.get_lock():
+            index = counter.value
+            counter.value += 1
+        os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+
+# one work unit: drift detection of one tool for one building (warmup and all trials), measured inside the worker
+def runUnit(index, building_id):
+    return index, building_id, worker_benchmarks[index].measureTrials(building_id)
+
+def availableCpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+# spreads the (tool, building) work units of all benchmarks across a process pool
+# workers: number of worker processes, None for one per available cpu
+# pin_cpus: pin every worker to its own cpu, so the workers do not migrate and disturb each other's timings
+# returns the measurements of every benchmark by building, ready for Benchmark.runBenchmark(measurements)
+def runParallel(benchmarks, workers=None, pin_cpus=False):
+    cpus = availableCpus()
+    if workers is None:
+        workers = len(cpus)
+    if pin_cpus and not hasattr(os, 'sched_setaffinity'):
+        print("CPU pinning is not supported on this platform, workers are not pinned")
+        pin_cpus = False
+
+    # fork shares the loaded dataset with the workers instead of pickling it
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    counter = context.Value('i', 0)
+
+    # benchmarks without drift detection per building (Benchmark.measuresBuildings) get no units and measure nothing here
+    measurements = [{} if benchmark.measuresBuildings() else None for benchmark in benchmarks]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initWorker,
+                             initargs=(benchmarks, cpus if pin_cpus else None, counter)) as executor:
+        futures = [executor.submit(runUnit, index, building_id)
+                   for index, benchmark in enumerate(benchmarks) if benchmark.measuresBuildings() for building_id in benchmark.buildings]
+        for future in as_completed(futures):
+            index, building_id, measurement = future.result()
+            measurements[index][building_id] = measurement
+
+    return measurements
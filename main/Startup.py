@@ -0,0 +1,87 @@
+# cold start of a tool in a clean python process: backend import (with per-module breakdown from -X importtime),
+# resident memory after the import and the latency of the first drift detection calls
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+import psutil # pip install psutil
+
+# default of the STARTUP criterion, see Benchmark.runStartup
+# calls: drift detection calls after the import, the first one pays lazy initialization (graph build, JIT, caches)
+# modules: number of slowest modules of the backend import that are reported
+DEFAULTS = {'calls': 5, 'modules': 10}
+
+# written to stderr around the backend import, only the importtime lines between them belong to the backend
+BACKEND_START = 'startup: backend import start'
+BACKEND_END = 'startup: backend import end'
+
+# modules imported between the markers: (module, self time in ms, cumulative time in ms)
+def parseImportTime(stderr):
+    modules = []
+    inside = False
+    for line in stderr.splitlines():
+        if line == BACKEND_START:
+            inside = True
+        elif line == BACKEND_END:
+            inside = False
+        elif inside and line.startswith('import time:') and '|' in line:
+            fields = line[len('import time:'):].split('|')
+            if not fields[0].strip().isdigit():
+                continue # header line
+            modules.append((fields[2].strip(), int(fields[0]) / 1000, int(fields[1]) / 1000))
+    return modules
+
+# runs the probe for the pickled tool and reference/current data in a fresh interpreter
+def measureStartup(tool, ref, cur, building_id, calls=5, modules=10):
+    with tempfile.NamedTemporaryFile(suffix='.pkl', delete=False) as f:
+        pickle.dump((tool, ref, cur, building_id, calls), f)
+        path = f.name
+    try:
+        st = time.perf_counter()
+        process = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(__file__), path],
+                                 capture_output=True, text=True)
+        process_seconds = time.perf_counter() - st
+    finally:
+        os.remove(path)
+    if process.returncode != 0:
+        raise RuntimeError("startup probe failed:\n" + process.stderr[-2000:])
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    backend_modules = parseImportTime(process.stderr)
+    result['process_seconds'] = process_seconds
+    result['modules'] = sorted(backend_modules, key=lambda module: module[1], reverse=True)[:modules]
+    return result
+
+# the child process: everything before the backend import (unpickling pulls in pandas and numpy) is not counted
+def probe(path):
+    with open(path, 'rb') as f:
+        tool, ref, cur, building_id, calls = pickle.load(f)
+    process = psutil.Process()
+    rss = process.memory_info().rss
+
+    sys.stderr.write(BACKEND_START + '\n')
+    sys.stderr.flush()
+    st = time.perf_counter()
+    tool.loadBackend()
+    import_seconds = time.perf_counter() - st
+    sys.stderr.flush()
+    sys.stderr.write(BACKEND_END + '\n')
+    sys.stderr.flush()
+    rss_after_import = process.memory_info().rss
+
+    latencies = []
+    for i in range(calls):
+        call_ref, call_cur = ref.copy(), cur.copy()
+        st = time.perf_counter()
+        tool.runDriftdetection(call_ref, call_cur, building_id)
+        latencies.append((time.perf_counter() - st) * 1000)
+
+    # last line of stdout, the tools may print before
+    print(json.dumps({'import_seconds': import_seconds, 'import_rss_mib': (rss_after_import - rss) / 1024 ** 2,
+                      'rss_after_import_mib': rss_after_import / 1024 ** 2, 'latencies': latencies}))
+
+if __name__ == "__main__":
+    probe(sys.argv[1])
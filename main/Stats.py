@@ -0,0 +1,458 @@
+import numpy as np
+from scipy import special, stats
+
+# Vectorized univariate two-sample drift statistics.
+# Samples are 2D arrays (rows x columns), every column is tested on its own, NaN values are ignored.
+# The tests follow the definitions (and names) of the Evidently stattests.
+
+# tests with a p-value as score: drift if score < threshold, all others are distances: drift if score >= threshold
+PVALUE_TESTS = {'ks', 'anderson', 'cramer_von_mises', 'mannw', 'es', 't_test'}
+THRESHOLDS = {'ks': 0.05, 'anderson': 0.05, 'cramer_von_mises': 0.05, 'mannw': 0.05, 'es': 0.05, 't_test': 0.05,
+              'wasserstein': 0.1, 'kl_div': 0.1, 'psi': 0.1, 'jensenshannon': 0.1, 'hellinger': 0.1, 'ed': 0.1}
+RANK_TESTS = {'ks', 'wasserstein', 'ed', 'anderson', 'cramer_von_mises', 'mannw'}
+BINNED_TESTS = {'psi', 'kl_div', 'jensenshannon', 'hellinger'}
+# rank tests that a ReferenceIndex scores without sorting the reference again
+INDEX_TESTS = {'ks', 'anderson', 'cramer_von_mises', 'mannw'}
+
+def asColumns(x):
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 1:
+        x = x[:, None]
+    return x
+
+# count, mean and variance of every column without NaN values (NaN for empty columns, no warnings)
+def moments(x, ddof=0):
+    x = asColumns(x)
+    valid = ~np.isnan(x)
+    count = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, x, 0).sum(axis=0) / count
+        var = np.where(valid, (x - mean) ** 2, 0).sum(axis=0) / (count - ddof)
+    return count, mean, np.where(count > ddof, var, np.nan)
+
+# reference and current sample sorted together per column, shared by all rank based tests
+class PooledSample:
+
+    def __init__(self, ref, cur):
+        ref = asColumns(ref)
+        cur = asColumns(cur)
+        self.n = np.sum(~np.isnan(ref), axis=0)
+        self.m = np.sum(~np.isnan(cur), axis=0)
+        self.N = self.n + self.m
+
+        z = np.concatenate([ref, cur])
+        order = np.argsort(z, axis=0, kind='stable') # NaN values are sorted to the end
+        self.values = np.take_along_axis(z, order, axis=0)
+        self.valid = ~np.isnan(self.values)
+        self.is_ref = (order < len(ref)) & self.valid
+        self.is_cur = (order >= len(ref)) & self.valid
+        self.cum_ref = np.cumsum(self.is_ref, axis=0)
+        self.cum_cur = np.cumsum(self.is_cur, axis=0)
+
+        # runs of tied values: first and last position of the run of every element
+        differs = self.values[1:] != self.values[:-1]
+        run_start = self.valid.copy()
+        run_start[1:] &= differs
+        self.run_end = self.valid.copy()
+        self.run_end[:-1] &= differs
+        pos = np.arange(len(z))[:, None]
+        self.run_first = np.maximum.accumulate(np.where(run_start, pos, 0), axis=0)
+        self.run_last = np.minimum.accumulate(np.where(self.run_end, pos, len(z))[::-1], axis=0)[::-1]
+        self.run_length = self.run_last - self.run_first + 1
+        self.midranks = (self.run_first + self.run_last) / 2 + 1
+
+    # difference of the empirical cdfs after every position
+    def cdfDiff(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.cum_ref / self.n - self.cum_cur / self.m
+
+    # integral of |F_ref - F_cur|^p between consecutive pooled values
+    def cdfIntegral(self, power):
+        delta = np.where(self.valid[1:], self.values[1:] - self.values[:-1], 0)
+        return np.sum(np.abs(self.cdfDiff()[:-1]) ** power * delta, axis=0)
+
+def ks(pooled):
+    d = np.max(np.where(pooled.run_end, np.abs(pooled.cdfDiff()), 0), axis=0)
+    return ksPvalue(d, pooled.n, pooled.m)
+
+# asymptotic two-sided p-value, like scipy.stats.ks_2samp(method='asymp')
+def ksPvalue(d, n, m):
+    en = np.round(n * m / np.maximum(n + m, 1))
+    return np.where(en > 0, stats.kstwo.sf(d, np.maximum(en, 1)), np.nan)
+
+# smallest KS distance whose ksPvalue falls below alpha for samples of n and m values
+def ksCritical(n, m, alpha=THRESHOLDS['ks']):
+    en = np.round(n * m / np.maximum(n + m, 1))
+    return np.where(en > 0, stats.kstwo.isf(alpha, np.maximum(en, 1)), np.nan)
+
+def wasserstein(pooled, ref):
+    # normed by the standard deviation of the reference like the Evidently stattest
+    norm = np.maximum(np.sqrt(moments(ref)[2]), 0.001)
+    return pooled.cdfIntegral(1) / norm
+
+def energyDistance(pooled):
+    return np.sqrt(2 * pooled.cdfIntegral(2))
+
+# scipy.stats.anderson_ksamp (midrank version) for two samples
+def anderson(pooled):
+    end = pooled.run_end
+    lj = pooled.run_length
+    Bj = pooled.run_first + lj / 2
+    N = pooled.N
+    A2 = np.zeros(pooled.values.shape[1])
+    for is_sample, cum, size in ((pooled.is_ref, pooled.cum_ref, pooled.n), (pooled.is_cur, pooled.cum_cur, pooled.m)):
+        before_run = np.take_along_axis(cum - is_sample, pooled.run_first, axis=0)
+        Mij = cum - (cum - before_run) / 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            inner = lj / N * (N * Mij - Bj * size) ** 2 / (Bj * (N - Bj) - N * lj / 4)
+            A2 += np.sum(np.where(end, inner, 0), axis=0) / size
+    return andersonPvalue(A2 * (N - 1) / N, pooled.n, pooled.m)
+
+def andersonPvalue(A2, n, m):
+    N = n + m
+    # standardize with the variance of the statistic for sample sizes n, m
+    with np.errstate(divide='ignore'):
+        H = 1 / n + 1 / m
+    h = np.zeros(len(N))
+    g = np.zeros(len(N))
+    for size in np.unique(N):
+        if size < 4:
+            continue
+        hs_cs = (1 / np.arange(size - 1, 1, -1)).cumsum()
+        h[N == size] = hs_cs[-1] + 1
+        g[N == size] = (hs_cs / np.arange(2, size)).sum()
+    k = 2
+    a = (4 * g - 6) * (k - 1) + (10 - 6 * g) * H
+    b = (2 * g - 4) * k ** 2 + 8 * h * k + (2 * g - 14 * h - 4) * H - 8 * h + 4 * g - 6
+    c = (6 * h + 2 * g - 2) * k ** 2 + (4 * h - 4 * g + 6) * k + (2 * h - 6) * H + 4 * h
+    d = (2 * h + 6) * k ** 2 - 4 * h * k
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sigmasq = (a * N ** 3 + b * N ** 2 + c * N + d) / ((N - 1.) * (N - 2.) * (N - 3.))
+        statistic = (A2 - (k - 1)) / np.sqrt(sigmasq)
+
+    # p-value interpolated from the critical values, capped to [0.001, 0.25]
+    p = np.exp(np.polyval(ANDERSON_FIT, np.clip(statistic, ANDERSON_CRITICAL.min(), ANDERSON_CRITICAL.max())))
+    p = np.where(statistic < ANDERSON_CRITICAL.min(), ANDERSON_SIG.max(), p)
+    p = np.where(statistic > ANDERSON_CRITICAL.max(), ANDERSON_SIG.min(), p)
+    return np.where(N >= 4, p, np.nan)
+
+# critical values of the standardized statistic for two samples (b0 + b1 / sqrt(k - 1) + b2 / (k - 1) with k = 2)
+ANDERSON_CRITICAL = (np.array([0.675, 1.281, 1.645, 1.96, 2.326, 2.573, 3.085])
+                     + np.array([-0.245, 0.25, 0.678, 1.149, 1.822, 2.364, 3.615])
+                     + np.array([-0.105, -0.305, -0.362, -0.391, -0.396, -0.345, -0.154]))
+ANDERSON_SIG = np.array([0.25, 0.1, 0.05, 0.025, 0.01, 0.005, 0.001])
+ANDERSON_FIT = np.polyfit(ANDERSON_CRITICAL, np.log(ANDERSON_SIG), 2)
+
+# scipy.stats.cramervonmises_2samp with the asymptotic p-value
+def cramerVonMises(pooled):
+    n, m, N = pooled.n, pooled.m, pooled.N
+    u = n * np.sum(np.where(pooled.is_ref, (pooled.midranks - pooled.cum_ref) ** 2, 0), axis=0)
+    u += m * np.sum(np.where(pooled.is_cur, (pooled.midranks - pooled.cum_cur) ** 2, 0), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = u / (n * m * N) - (4 * m * n - 1) / (6 * N)
+    return cvmPvalue(t, n, m)
+
+def cvmPvalue(t, n, m):
+    # float sizes, the variance term overflows int64 for large samples
+    n, m = np.asarray(n, dtype=float), np.asarray(m, dtype=float)
+    N = n + m
+    k = n * m
+    with np.errstate(invalid='ignore', divide='ignore'):
+        et = (1 + 1 / N) / 6
+        vt = (N + 1) * (4 * k * N - 3 * (n ** 2 + m ** 2) - 2 * k) / (45 * N ** 2 * 4 * k)
+        tn = 1 / 6 + (t - et) / np.sqrt(45 * vt)
+    return np.where(k > 0, np.maximum(0, 1 - cvmCdfInf(tn)), np.nan)
+
+# limiting distribution of the Cramer-von-Mises statistic (series of Anderson and Darling 1952)
+def cvmCdfInf(x):
+    x = np.atleast_1d(np.asarray(x, dtype=float))
+    total = np.zeros_like(x)
+    todo = np.isfinite(x) & (x > 0)
+    k = 0
+    while np.any(todo):
+        xs = x[todo]
+        y = 4 * k + 1
+        q = y ** 2 / (16 * xs)
+        term = (np.exp(special.gammaln(k + 0.5) - special.gammaln(k + 1)) / (np.pi ** 1.5 * np.sqrt(xs))
+                * np.sqrt(y) * np.exp(-q) * special.kv(0.25, q))
+        total[todo] += term
+        todo[todo] = np.abs(term) >= 1e-7
+        k += 1
+    return np.where(np.isnan(x), np.nan, total)
+
+# two-sided Mann-Whitney U test, normal approximation with tie and continuity correction
+def mannWhitney(pooled):
+    n, m = pooled.n, pooled.m
+    u1 = np.sum(np.where(pooled.is_ref, pooled.midranks, 0), axis=0) - n * (n + 1) / 2
+    ties = np.sum(np.where(pooled.run_end, pooled.run_length ** 3 - pooled.run_length, 0), axis=0)
+    return mannWhitneyPvalue(u1, ties, n, m)
+
+def mannWhitneyPvalue(u1, ties, n, m):
+    N = n + m
+    u = np.maximum(u1, n * m - u1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s = np.sqrt(n * m / 12 * ((N + 1) - ties / (N * (N - 1))))
+        z = (u - n * m / 2 - 0.5) / s
+    return np.where(n * m > 0, np.clip(2 * stats.norm.sf(z), 0, 1), np.nan)
+
+# reference sorted once for scoring many current windows against it (streaming windows, repeated calls): the rank tests
+# only need the position of every current value in the sorted reference, so a window of m values costs O(m log m + m log n)
+# instead of sorting all n + m values again, anderson still visits every distinct reference value (O(n), no sorting)
+class ReferenceIndex:
+
+    def __init__(self, ref):
+        ref = asColumns(ref)
+        self.n = np.sum(~np.isnan(ref), axis=0)
+        self.ties = np.zeros(ref.shape[1])
+        # per column: distinct values, their counts and the number of smaller values (the ECDF times n)
+        self.columns = []
+        sorted_ref = np.sort(ref, axis=0)
+        for j, n in enumerate(self.n):
+            x = sorted_ref[:n, j]
+            start = np.flatnonzero(np.concatenate([[n > 0], x[1:] != x[:-1]]))
+            below = np.append(start, n)
+            counts = np.diff(below).astype(float)
+            self.columns.append((x[start], counts, below.astype(float)))
+            self.ties[j] = np.sum(counts ** 3 - counts)
+        self.nbytes = sum(values.nbytes + counts.nbytes + below.nbytes for values, counts, below in self.columns)
+
+    # distinct values u of the sorted current column c with their counts b, the number of smaller current values cb,
+    # the number of smaller reference values lo and the number of tied reference values a
+    def locate(self, j, c):
+        values, counts, below = self.columns[j]
+        start = np.flatnonzero(np.concatenate([[len(c) > 0], c[1:] != c[:-1]]))
+        u = c[start]
+        cb = start.astype(float)
+        b = np.diff(np.append(start, len(c))).astype(float)
+        pos = np.searchsorted(values, u)
+        equal = (pos < len(values)) & (np.append(values, 0)[pos] == u)
+        a = np.where(equal, np.append(counts, 0)[pos], 0)
+        return u, b, cb, below[pos], a
+
+    # p-values of the tests in INDEX_TESTS for the current sample, equal to the PooledSample versions
+    def scores(self, cur, tests):
+        cur = np.sort(asColumns(cur), axis=0)
+        n = self.n
+        m = np.sum(~np.isnan(cur), axis=0)
+        d, u1, ties, t, A2 = (np.zeros(cur.shape[1]) for i in range(5))
+        for j in range(cur.shape[1]):
+            c = cur[:m[j], j]
+            u, b, cb, lo, a = self.locate(j, c)
+            hi = lo + a
+            nj, mj, Nj = float(n[j]), float(m[j]), float(n[j] + m[j])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                # largest ECDF difference: at the current values and right before them
+                d[j] = max(np.max(np.abs(hi / nj - (cb + b) / mj), initial=0), np.max(np.abs(lo / nj - cb / mj), initial=0))
+
+                # U of the reference from the smaller and tied reference values of every current value
+                u1[j] = nj * mj - np.sum(b * (lo + a / 2))
+                ties[j] = self.ties[j] + np.sum((a + b) ** 3 - (a + b) - (a ** 3 - a))
+
+                # squared rank shifts, all reference values between two current values are shifted by the same count
+                gaps = lo - np.concatenate([[0], hi[:-1]])
+                ref_sum = np.sum(gaps * cb ** 2) + (nj - (hi[-1] if len(hi) else 0)) * mj ** 2 + \
+                    np.sum(a * (cb + b / 2) ** 2) + self.ties[j] / 12
+                cur_sum = np.sum(b * (lo + a / 2) ** 2 + (b ** 3 - b) / 12)
+                t[j] = (nj * ref_sum + mj * cur_sum) / (nj * mj * Nj) - (4 * mj * nj - 1) / (6 * Nj)
+
+            if 'anderson' in tests:
+                A2[j] = self.andersonStatistic(j, c, u, b, cb, lo, a)
+
+        scores = {'ks': lambda: ksPvalue(d, n, m), 'mannw': lambda: mannWhitneyPvalue(u1, ties, n, m),
+                  'cramer_von_mises': lambda: cvmPvalue(t, n, m), 'anderson': lambda: andersonPvalue(A2, n, m)}
+        return {test: scores[test]() for test in tests}
+
+    # A2 of anderson() summed over the distinct reference values and the current values that are not in the reference
+    def andersonStatistic(self, j, c, u, b, cb, lo, a):
+        values, counts, below = self.columns[j]
+        cur_lo = np.searchsorted(c, values, 'left')
+        cur_tied = np.searchsorted(c, values, 'right') - cur_lo
+        only_cur = a == 0
+        lj = np.concatenate([counts + cur_tied, b[only_cur]])
+        Bj = np.concatenate([below[:-1] + cur_lo, (lo + cb)[only_cur]]) + lj / 2
+        M_ref = np.concatenate([below[:-1] + counts / 2, lo[only_cur]])
+        M_cur = np.concatenate([cur_lo + cur_tied / 2, (cb + b / 2)[only_cur]])
+        n, m = float(self.n[j]), float(len(c))
+        N = n + m
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = lj / N / (Bj * (N - Bj) - N * lj / 4)
+            A2 = np.sum(weight * (N * M_ref - Bj * n) ** 2) / n + np.sum(weight * (N * M_cur - Bj * m) ** 2) / m
+            return A2 * (N - 1) / N
+
+# pooled variance t-test like scipy.stats.ttest_ind
+def tTest(ref, cur):
+    n, mean_ref, var_ref = moments(ref, ddof=1)
+    m, mean_cur, var_cur = moments(cur, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        df = n + m - 2
+        var = ((n - 1) * var_ref + (m - 1) * var_cur) / df
+        t = (mean_ref - mean_cur) / np.sqrt(var * (1 / n + 1 / m))
+        return 2 * stats.t.sf(np.abs(t), df)
+
+# Epps-Singleton test on the empirical characteristic function like scipy.stats.epps_singleton_2samp
+def eppsSingleton(ref, cur, t=(0.4, 0.8)):
+    ref = asColumns(ref)
+    cur = asColumns(cur)
+    n = np.sum(~np.isnan(ref), axis=0)
+    m = np.sum(~np.isnan(cur), axis=0)
+    N = n + m
+    q25 = np.full(len(N), np.nan)
+    q75 = np.full(len(N), np.nan)
+    filled = N > 0
+    q25[filled], q75[filled] = np.nanpercentile(np.concatenate([ref, cur])[:, filled], [25, 75], axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ts = np.asarray(t)[None, :] / ((q75 - q25) / 2)[:, None]
+
+    def ecf(x, size):
+        valid = ~np.isnan(x)[:, :, None]
+        tx = np.nan_to_num(x)[:, :, None] * ts[None, :, :]
+        g = np.where(valid, np.concatenate([np.cos(tx), np.sin(tx)], axis=2), 0)
+        mean = g.sum(axis=0) / size[:, None]
+        centered = np.where(valid, g - mean, 0)
+        cov = np.einsum('rki,rkj->kij', centered, centered) / size[:, None, None]
+        return mean, cov
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_ref, cov_ref = ecf(ref, n)
+        mean_cur, cov_cur = ecf(cur, m)
+        est_cov = (N / n)[:, None, None] * cov_ref + (N / m)[:, None, None] * cov_cur
+    usable = np.all(np.isfinite(est_cov), axis=(1, 2)) & (n >= 5) & (m >= 5) & (q75 > q25)
+    p = np.full(len(N), np.nan)
+    if not np.any(usable):
+        return p
+
+    est_cov_inv = np.linalg.pinv(est_cov[usable])
+    rank = np.linalg.matrix_rank(est_cov_inv)
+    g_diff = (mean_ref - mean_cur)[usable]
+    w = N[usable] * np.einsum('ki,kij,kj->k', g_diff, est_cov_inv, g_diff)
+    # small sample correction
+    small = np.maximum(n, m)[usable] < 25
+    corr = 1.0 / (1.0 + N[usable] ** (-0.45) + 10.1 * (n[usable] ** (-1.7) + m[usable] ** (-1.7)))
+    w = np.where(small, corr * w, w)
+    p[usable] = stats.chi2.sf(w, rank)
+    return p
+
+# histograms of reference and current on the same Sturges bins of the pooled sample (one row per column)
+def histograms(ref, cur):
+    ref = asColumns(ref)
+    cur = asColumns(cur)
+    N = np.sum(~np.isnan(ref), axis=0) + np.sum(~np.isnan(cur), axis=0)
+    bins = np.where(N > 0, np.ceil(np.log2(np.maximum(N, 1))) + 1, 1).astype(int)
+    lo = np.fmin(np.nanmin(ref, axis=0, initial=np.inf), np.nanmin(cur, axis=0, initial=np.inf))
+    hi = np.fmax(np.nanmax(ref, axis=0, initial=-np.inf), np.nanmax(cur, axis=0, initial=-np.inf))
+    same = hi <= lo
+    lo = np.where(same, lo - 0.5, lo)
+    hi = np.where(same, hi + 0.5, hi)
+    edges = (lo, hi, bins)
+    return binCounts(ref, edges), binCounts(cur, edges), np.arange(bins.max())[None, :] < bins[:, None]
+
+# bin of every value on equal width bins given by (lower edges, upper edges, number of bins), values outside fall into the outer bins
+def binIndex(x, edges):
+    lo, hi, bins = edges
+    x = asColumns(x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        idx = np.clip(np.nan_to_num(np.floor((x - lo) * (bins / (hi - lo)))), 0, bins - 1).astype(int)
+        # correct rounding errors at the edges like np.histogram does
+        idx -= (idx > 0) & (x < lo + idx * ((hi - lo) / bins))
+        idx += (idx < bins - 1) & (x >= np.where(idx + 1 == bins, hi, lo + (idx + 1) * ((hi - lo) / bins)))
+    return idx
+
+# counts per column on the bins of binIndex (one row per column)
+def binCounts(x, edges):
+    x = asColumns(x)
+    valid = ~np.isnan(x)
+    idx = binIndex(x, edges)
+    width = edges[2].max()
+    flat = (idx + np.arange(x.shape[1]) * width)[valid]
+    return np.bincount(flat, minlength=x.shape[1] * width).reshape(x.shape[1], width)
+
+# PSI, Kullback-Leibler divergence, Jensen-Shannon distance and Hellinger distance from the same bin counts
+def binnedDivergences(ref_counts, cur_counts, bin_mask):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = ref_counts / ref_counts.sum(axis=1, keepdims=True)
+        q = cur_counts / cur_counts.sum(axis=1, keepdims=True)
+        # empty bins get a small percentage, otherwise the logarithms are not defined
+        p = np.where(bin_mask, np.where(p == 0, 0.0001, p), 0)
+        q = np.where(bin_mask, np.where(q == 0, 0.0001, q), 0)
+        psi = np.sum(np.where(bin_mask, (p - q) * np.log(p / q), 0), axis=1)
+
+        P = p / p.sum(axis=1, keepdims=True)
+        Q = q / q.sum(axis=1, keepdims=True)
+        kld = np.sum(np.where(bin_mask, P * np.log(P / Q), 0), axis=1)
+        M = (P + Q) / 2
+        js = 0.5 * np.sum(np.where(bin_mask, P * np.log(P / M), 0), axis=1) + 0.5 * np.sum(np.where(bin_mask, Q * np.log(Q / M), 0), axis=1)
+        hd = np.sqrt(np.sum((np.sqrt(P) - np.sqrt(Q)) ** 2, axis=1)) / np.sqrt(2)
+    return {'psi': psi, 'kl_div': kld, 'jensenshannon': np.sqrt(np.maximum(js, 0)), 'hellinger': hd}
+
+def isDrifted(test, scores):
+    if test in PVALUE_TESTS:
+        return scores < THRESHOLDS[test]
+    return scores >= THRESHOLDS[test]
+
+# scores of all given tests for every column, sorting and histograms are computed once and shared between the tests
+# index: ReferenceIndex of ref, the tests in INDEX_TESTS then only sort the current sample
+def driftScores(ref, cur, tests, index=None):
+    ref = asColumns(ref)
+    cur = asColumns(cur)
+    scores = {}
+
+    rank_tests = RANK_TESTS & set(tests)
+    if index is not None:
+        scores.update(index.scores(cur, rank_tests & INDEX_TESTS))
+        rank_tests -= INDEX_TESTS
+    if rank_tests:
+        pooled = PooledSample(ref, cur)
+        for test in rank_tests:
+            if test == 'ks':
+                scores[test] = ks(pooled)
+            elif test == 'wasserstein':
+                scores[test] = wasserstein(pooled, ref)
+            elif test == 'ed':
+                scores[test] = energyDistance(pooled)
+            elif test == 'anderson':
+                scores[test] = anderson(pooled)
+            elif test == 'cramer_von_mises':
+                scores[test] = cramerVonMises(pooled)
+            elif test == 'mannw':
+                scores[test] = mannWhitney(pooled)
+
+    if BINNED_TESTS & set(tests):
+        divergences = binnedDivergences(*histograms(ref, cur))
+        for test in BINNED_TESTS & set(tests):
+            scores[test] = divergences[test]
+
+    if 'es' in tests:
+        scores['es'] = eppsSingleton(ref, cur)
+    if 't_test' in tests:
+        scores['t_test'] = tTest(ref, cur)
+
+    return {test: (score, isDrifted(test, score)) for test, score in scores.items()}
+
+# samples of several buildings (rows x columns each, different numbers of rows) as one padded array
+# (buildings x rows x columns) and the mask of the valid rows (buildings x rows), padding is NaN
+def padBuildings(samples):
+    samples = [asColumns(sample) for sample in samples]
+    rows = max((len(sample) for sample in samples), default=0)
+    columns = samples[0].shape[1] if samples else 0
+    x = np.full((len(samples), rows, columns), np.nan)
+    mask = np.zeros((len(samples), rows), dtype=bool)
+    for b, sample in enumerate(samples):
+        x[b, :len(sample)] = sample
+        mask[b, :len(sample)] = True
+    return x, mask
+
+# padded array (buildings x rows x columns) as columns of driftScores (rows x buildings * columns), values outside the
+# mask (buildings x rows or buildings x rows x columns) become NaN and are ignored like missing values
+def flattenBuildings(x, mask=None):
+    x = np.asarray(x, dtype=float)
+    if mask is not None:
+        mask = np.asarray(mask, dtype=bool)
+        x = np.where(mask[:, :, None] if mask.ndim == 2 else mask, x, np.nan)
+    return x.transpose(1, 0, 2).reshape(x.shape[1], -1)
+
+# driftScores of all buildings and columns at once: every (building, column) is one column of the kernels, so sorting,
+# histograms and p-values run once for all buildings, scores and drift decisions are (buildings x columns)
+def batchedDriftScores(ref, cur, tests, ref_mask=None, cur_mask=None):
+    buildings, columns = np.shape(ref)[0], np.shape(ref)[2]
+    scores = driftScores(flattenBuildings(ref, ref_mask), flattenBuildings(cur, cur_mask), tests)
+    return {test: (score.reshape(buildings, columns), drifted.reshape(buildings, columns)) for test, (score, drifted) in scores.items()}
@@ -0,0 +1,36 @@
+import numpy as np
+
+# default micro-batches of the STREAMING criterion, see Benchmark.runStreaming
+# windows: rows per micro-batch of the current set (e.g. 1 day, 1 week and 30 days of hourly data), single rows make most
+# tests fail or meaningless
+# step: rows between the starts of two windows, None for tumbling windows (step = window)
+# max_windows: windows per building and window size, None for the whole current set (one call per window, hours for the
+# slow tools on small windows)
+DEFAULTS = {'windows': [24, 168, 720], 'step': None, 'max_windows': 50}
+
+# micro-batches of the current set in arrival order, the last incomplete window is dropped
+def windows(cur, size, step=None, max_windows=None):
+    step = step or size
+    starts = range(0, len(cur) - size + 1, step)
+    if max_windows is not None:
+        starts = starts[:max_windows]
+    for start in starts:
+        yield cur.iloc[start:start + size]
+
+# fixed overhead per call (ms) and cost per row (ms) of a tool from the median latency at the different window sizes:
+# latency = overhead + per_row * rows, a large overhead compared to per_row * rows means the tool is dominated by
+# report construction or detector initialization at this batch size
+# both are costs and clamped to 0: a negative fit means the noise is larger than the cost, the other one is then fitted alone
+def overheadFit(sizes, latencies):
+    sizes = np.asarray(sizes, dtype=float)
+    latencies = np.asarray(latencies, dtype=float)
+    valid = np.isfinite(latencies)
+    sizes, latencies = sizes[valid], latencies[valid]
+    if len(np.unique(sizes)) < 2:
+        return np.nan, np.nan
+    per_row, overhead = np.polyfit(sizes, latencies, 1)
+    if per_row < 0:
+        per_row, overhead = 0.0, np.mean(latencies)
+    elif overhead < 0:
+        per_row, overhead = np.sum(sizes * latencies) / np.sum(sizes ** 2), 0.0
+    return float(overhead), float(per_row)
@@ -1,15 +1,13 @@
-from evidently.report import Report
-from evidently.metric_preset import DataDriftPreset
-from evidently.metrics import *
-from evidently import ColumnMapping
-
-import nannyml as nml # pip install nannyml
-
-from alibi_detect.cd import KSDrift, CVMDrift, SpotTheDiffDrift
-
+# the backends of the tools (evidently, nannyml, alibi_detect with tensorflow) are imported on first use of a tool,
+# see Tool.importBackend, so only the selected tools pay their import time and memory
 from enum import Enum
+import importlib.metadata
+import itertools
+import time
 import pandas as pd # pip install pandas
 import numpy as np
+import psutil # pip install psutil
+from Cache import LRUCache, arrayFingerprint, frameFingerprint
 
 class METHODS(Enum):
     KOLMOGOROV_SMIRNOV = 0 # K-S Test
@@ -26,31 +24,155 @@ class METHODS(Enum):
     TT = 11 # T-Test
     SPOTDIFF = 12 # Spot-The-Difference Test
 
+# tool classes by name, filled by registerTool and by the entry points of installed plugins
+TOOLS = {}
+
+# import time (s) and resident memory (MiB) of the backend of every used tool
+IMPORT_REPORT = {}
+
+def registerTool(cls):
+    TOOLS[cls.__name__] = cls
+    return cls
+
+# registers the tools of installed plugins, a plugin package declares its Tool subclasses as entry points:
+# entry_points={'d3bench.tools': ['MyTool = mypackage.tools:MyTool']}
+def loadPlugins(group='d3bench.tools'):
+    entry_points = importlib.metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        entry_points = entry_points.select(group=group)
+    else:
+        entry_points = entry_points.get(group, [])
+    for entry_point in entry_points:
+        TOOLS[entry_point.name] = entry_point.load()
+    return TOOLS
+
+def createTool(tool_name, *args, **kwargs):
+    if tool_name not in TOOLS:
+        loadPlugins()
+    return TOOLS[tool_name](*args, **kwargs)
+
+def printImportReport():
+    print("==============================")
+    print("Backend import costs")
+    for backend, costs in IMPORT_REPORT.items():
+        print("{}: {:.3f} seconds, {:.1f} MiB".format(backend, costs['seconds'], costs['rss_mib']))
+    print("==============================")
+
 class Tool:
     # Class attributes
     name = "Tool"
+    # increase when the results of the tool change (e.g. a fix of its statistics), so cached results of older versions are not used anymore
+    version = 1
+    # distributions of the backend, their installed versions are part of the result cache key
+    packages = ()
+    # creates the memory sampler for every method (see Memory.py), None measures no memory, set by the benchmark for memory runs
+    memorySampler = None
+    # sampling profiler of the current call (see Profiler.py), timeMethod tells it which method runs
+    profiler = None
+    # wall time (ms), cpu time (ms), peak and average memory above the baseline (MiB) of every method of the last runDriftdetection,
+    # by name in the report
+    # methods computed together (batched reports, shared statistics) are recorded as 'batched'
+    method_timings = {}
 
     def __init__(self, name):
         self.name = name
         self.showReport = False
 
+    # imports the backend once per tool class and records its costs in IMPORT_REPORT
+    def loadBackend(self):
+        backend = type(self).__name__
+        if backend in IMPORT_REPORT:
+            return
+        process = psutil.Process()
+        rss = process.memory_info().rss
+        st = time.time()
+        self.importBackend()
+        IMPORT_REPORT[backend] = {'seconds': time.time() - st, 'rss_mib': (process.memory_info().rss - rss) / 1024 ** 2}
+
+    # imports the modules of the tool into the module namespace
+    def importBackend(self):
+        pass
+
+    # runs one method of the dispatch loop and records its costs in method_timings, also if the method fails
+    def timeMethod(self, label, function, *args):
+        sampler = self.memorySampler() if self.memorySampler else None
+        if sampler:
+            sampler.start()
+        if self.profiler:
+            self.profiler.method = label
+        st = time.perf_counter()
+        st_cpu = time.process_time()
+        try:
+            return function(*args)
+        finally:
+            if self.profiler:
+                self.profiler.method = None
+            timing = {'runtime': (time.perf_counter() - st) * 1000, 'cpu_runtime': (time.process_time() - st_cpu) * 1000,
+                      'ram_peak': float('nan'), 'ram_avg': float('nan')}
+            if sampler:
+                memory = sampler.stop()
+                timing['ram_peak'] = memory['peak']
+                timing['ram_avg'] = memory['avg']
+            self.method_timings[label] = timing
+
+    # options of the tool that change its results (thresholds, configs), part of the result cache key
+    def settings(self):
+        return {}
+
+    # everything except the data a drift result of the tool depends on, see Cache.ResultCache
+    def cacheKey(self):
+        versions = {}
+        for package in self.packages:
+            try:
+                versions[package] = importlib.metadata.version(package)
+            except importlib.metadata.PackageNotFoundError:
+                versions[package] = None
+        return {'tool': type(self).__name__, 'version': self.version, 'packages': versions,
+                'methods': sorted(method.name for method in self.methods), 'settings': self.settings()}
+
     def preprocess(self):
         pass
     
     def runDriftdetection(self, ref, cur, building_id):
         pass
+
+    # drift detection of several buildings in one call, {building_id: result of runDriftdetection}, tools without a batched
+    # implementation run the buildings one after the other
+    def runDriftdetectionBatched(self, refs, curs, building_ids):
+        return {building_id: self.runDriftdetection(ref, cur, building_id) for ref, cur, building_id in zip(refs, curs, building_ids)}
     
     def __runDriftdetectiontest(self, building_id, test):
         pass
 
+@registerTool
 class Evidently(Tool):
-    def __init__(self, name, showReport=False):
+    packages = ('evidently',)
+    # name in the report and Evidently stattest of every method
+    stattests = {METHODS.WASSERSTEIN: ('Wasserstein Distanz', 'wasserstein'), METHODS.KLD: ('K-L Divergence', 'kl_div'),
+                 METHODS.PSI: ('PSI', 'psi'), METHODS.JSD: ('J-S Distance', 'jensenshannon'), METHODS.AD: ('Anderson-Darling', 'anderson'),
+                 METHODS.CVM: ('Cramer-von-Mises', 'cramer_von_mises'), METHODS.HD: ('Hellinger-Distance', 'hellinger'),
+                 METHODS.MWURT: ('Mann-Whitney U-Rank Test', 'mannw'), METHODS.ED: ('Energy-Distance', 'ed'),
+                 METHODS.ES: ('Epps-Singleton', 'es'), METHODS.TT: ('T-Test', 't_test'), METHODS.KOLMOGOROV_SMIRNOV: ('K-S Test', 'ks')}
+
+    # batched: compute all stattests in one report instead of one report per stattest
+    def __init__(self, name, showReport=False, batched=False):
         super().__init__(name)
         self.showReport = showReport
+        self.batched = batched
         #self.methods = {}
         self.methods = {METHODS.WASSERSTEIN, METHODS.KLD, METHODS.PSI, METHODS.JSD, METHODS.AD, METHODS.CVM, METHODS.HD, 
                METHODS.MWURT, METHODS.ED, METHODS.ES, METHODS.TT, METHODS.KOLMOGOROV_SMIRNOV}
 
+    def importBackend(self):
+        global Report, DataDriftPreset, ColumnDriftMetric, ColumnMapping
+        from evidently.report import Report
+        from evidently.metric_preset import DataDriftPreset
+        from evidently.metrics import ColumnDriftMetric
+        from evidently import ColumnMapping
+
+    def settings(self):
+        return {'batched': self.batched}
+
     def preprocess(self):
         if 'consumption' in self.ref:
             self.ref.rename(columns={'consumption': 'target'}, inplace=True)
@@ -69,38 +191,24 @@ class Evidently(Tool):
 
     #@profile
     def runDriftdetection(self, ref, cur, building_id):
+        self.loadBackend()
+        self.method_timings = {}
         self.ref = ref
         self.cur = cur
         self.preprocess()
+        if self.batched:
+            return self.__runBatched(building_id)
+
         my_dict = {}
         for test in self.methods:
-            if test == METHODS.WASSERSTEIN:
-                my_dict['Wasserstein Distanz'] = self.__runDriftdetectiontest(building_id, 'wasserstein')
-            elif test == METHODS.KLD:
-                my_dict['K-L Divergence'] = self.__runDriftdetectiontest(building_id, 'kl_div')
-            elif test == METHODS.PSI:
-                my_dict['PSI'] = self.__runDriftdetectiontest(building_id, 'psi')
-            elif test == METHODS.JSD:
-                my_dict['J-S Distance'] = self.__runDriftdetectiontest(building_id, 'jensenshannon')
-            elif test == METHODS.AD:
-                my_dict['Anderson-Darling'] = self.__runDriftdetectiontest(building_id, 'anderson')
-            elif test == METHODS.CVM:
-                my_dict['Cramer-von-Mises'] = self.__runDriftdetectiontest(building_id, 'cramer_von_mises')
-            elif test == METHODS.HD:
-                my_dict['Hellinger-Distance'] = self.__runDriftdetectiontest(building_id, 'hellinger')
-            elif test == METHODS.MWURT:
-                my_dict['Mann-Whitney U-Rank Test'] = self.__runDriftdetectiontest(building_id, 'mannw')
-            elif test == METHODS.ED:
-                my_dict['Energy-Distance'] = self.__runDriftdetectiontest(building_id, 'ed')
-            elif test == METHODS.ES:
+            label, stattest = self.stattests[test]
+            if test == METHODS.ES:
                 try:
-                    my_dict['Epps-Singleton'] = self.__runDriftdetectiontest(building_id, 'es')
+                    my_dict[label] = self.timeMethod(label, self.__runDriftdetectiontest, building_id, stattest)
                 except:
-                    my_dict['Epps-Singleton'] = 'no result'
-            elif test == METHODS.TT:
-                my_dict['T-Test'] = self.__runDriftdetectiontest(building_id, 't_test')
-            elif test == METHODS.KOLMOGOROV_SMIRNOV:
-                my_dict['K-S Test'] = self.__runDriftdetectiontest(building_id, 'ks')
+                    my_dict[label] = 'no result'
+            else:
+                my_dict[label] = self.timeMethod(label, self.__runDriftdetectiontest, building_id, stattest)
 
         return my_dict
 
@@ -123,13 +231,64 @@ class Evidently(Tool):
             my_dict[f"{col}_is_drifted"] = report_dict['metrics'][1]['result']['drift_by_columns'][col]['drift_detected']
 
         return my_dict
+
+    # all stattests in one report, Epps-Singleton fails on some data and gets its own report so the other results are kept
+    def __runBatched(self, building_id):
+        tests = [self.stattests[test] for test in self.methods if test != METHODS.ES]
+        my_dict = {}
+        if tests:
+            my_dict = self.timeMethod('batched', self.__runReport, building_id, 'batched', tests)
+        if METHODS.ES in self.methods:
+            label, stattest = self.stattests[METHODS.ES]
+            try:
+                my_dict.update(self.timeMethod(label, self.__runReport, building_id, stattest, [(label, stattest)]))
+            except:
+                my_dict[label] = 'no result'
+
+        return my_dict
+
+    # one ColumnDriftMetric per column and stattest, the results are read from the metrics instead of report.as_dict()
+    def __runReport(self, building_id, report_name, tests):
+        metrics = {(label, col): ColumnDriftMetric(column_name=col, stattest=stattest)
+                   for label, stattest in tests for col in self.column_names}
+        report = Report(metrics=list(metrics.values()))
+        report.run(reference_data=self.ref, current_data=self.cur)
+        if(self.showReport):
+            file_name = "evidently_report_{}_{}.html".format(building_id, report_name)
+            report.save_html(file_name)
+
+        # add into dictionary
+        my_dict = {label: {} for label, stattest in tests}
+        for (label, col), metric in metrics.items():
+            result = metric.get_result()
+            my_dict[label][f"{col}_drift_score"] = result.drift_score
+            my_dict[label][f"{col}_is_drifted"] = result.drift_detected
+
+        return my_dict
     
+@registerTool
 class NannyML(Tool):
-    def __init__(self, name, showReport=False):
+    packages = ('nannyml',)
+    # name in the report and NannyML method of every method
+    nannymlMethods = {METHODS.KOLMOGOROV_SMIRNOV: ('K-S Test', 'kolmogorov_smirnov'), METHODS.WASSERSTEIN: ('Wasserstein Distance', 'wasserstein'),
+                      METHODS.JSD: ('J-S Distance', 'jensen_shannon'), METHODS.HD: ('Hellinger-Distance', 'hellinger')}
+
+    # batched: fit one calculator with all methods instead of one calculator per method
+    # cache_size: number of fitted calculators kept, runs against an already fitted reference skip fitting (0: always fit, as timed in the benchmark)
+    def __init__(self, name, showReport=False, batched=False, cache_size=0):
         super().__init__(name)
         self.showReport = showReport
+        self.batched = batched
+        self.calculators = LRUCache(cache_size)
         self.methods = {METHODS.KOLMOGOROV_SMIRNOV, METHODS.WASSERSTEIN, METHODS.JSD, METHODS.HD}
 
+    def importBackend(self):
+        global nml
+        import nannyml as nml # pip install nannyml
+
+    def settings(self):
+        return {'batched': self.batched}
+
     def preprocess(self):
         if 'temp_outside' in self.ref:
             self.ref = self.ref.drop(columns={'ids'})
@@ -145,20 +304,19 @@ class NannyML(Tool):
     
     #@profile
     def runDriftdetection(self, ref, cur, building_id):
+        self.loadBackend()
+        self.method_timings = {}
         self.ref = ref
         self.cur = cur
         self.preprocess()
 
+        tests = [self.nannymlMethods[test] for test in self.methods]
+        if self.batched:
+            return self.timeMethod('batched', self.__runDriftdetectiontests, building_id, tests)
+
         my_dict = {}
-        for test in self.methods:
-            if test == METHODS.KOLMOGOROV_SMIRNOV:
-                my_dict['K-S Test'] = self.__runDriftdetectiontest(building_id, 'kolmogorov_smirnov')
-            elif test == METHODS.WASSERSTEIN:
-                my_dict['Wasserstein Distance'] = self.__runDriftdetectiontest(building_id, 'wasserstein')
-            elif test == METHODS.JSD:
-                my_dict['J-S Distance'] = self.__runDriftdetectiontest(building_id, 'jensen_shannon')
-            elif test == METHODS.HD:
-                my_dict['Hellinger-Distance'] = self.__runDriftdetectiontest(building_id, 'hellinger')
+        for test in tests:
+            my_dict.update(self.timeMethod(test[0], self.__runDriftdetectiontests, building_id, [test]))
 
         return my_dict
    
@@ -166,41 +324,72 @@ class NannyML(Tool):
     # drift score is the mean of all chunks
     # is_drifted is the mean of True/False depending on the threshold, computed to %
     #@profile
-    def __runDriftdetectiontest(self, building_id, test):
-        calc = nml.UnivariateDriftCalculator(
-            column_names=self.column_names,
-            timestamp_column_name='time',
-            continuous_methods=[test],
-            thresholds = {
-                'kolmogorov_smirnov': nml.thresholds.StandardDeviationThreshold(std_lower_multiplier=None),
-                'jensen_shannon':  nml.thresholds.ConstantThreshold(upper=0.1),
-                'wasserstein':  nml.thresholds.StandardDeviationThreshold(std_lower_multiplier=None),
-                'hellinger':  nml.thresholds.ConstantThreshold(upper=0.1),}
-        )
-
-        calc.fit(self.ref)
+    def __runDriftdetectiontests(self, building_id, tests):
+        methods = [method for label, method in tests]
+        calc = self.__fittedCalculator(methods)
         results = calc.calculate(self.cur)
         df = results.filter(period='analysis', column_names=self.column_names).to_df()
 
-        if(self.showReport):
-            figure = results.filter(column_names=results.continuous_column_names, methods=[test]).plot(kind='distribution')
-            figure.write_image(f'nannyml_report_dist_{building_id}_{test}.svg')
-            figure = results.filter(column_names=results.continuous_column_names, methods=[test]).plot(kind='drift')
-            figure.write_image(f'nannyml_report_drift_{building_id}_{test}.svg')
-            
-        # add into dictionary
+        # add into dictionary, one entry per method
         my_dict = {}
-        for col in self.column_names:
-            my_dict[f"{col}_drift_score"] = df[col][test]['value'].mean()
-            my_dict[f"{col}_is_drifted"] = str(round(df[col][test]['alert'].mean() * 100, 1)) + " % drifted"
+        for label, test in tests:
+            if(self.showReport):
+                figure = results.filter(column_names=results.continuous_column_names, methods=[test]).plot(kind='distribution')
+                figure.write_image(f'nannyml_report_dist_{building_id}_{test}.svg')
+                figure = results.filter(column_names=results.continuous_column_names, methods=[test]).plot(kind='drift')
+                figure.write_image(f'nannyml_report_drift_{building_id}_{test}.svg')
+
+            my_dict[label] = {}
+            for col in self.column_names:
+                my_dict[label][f"{col}_drift_score"] = df[col][test]['value'].mean()
+                my_dict[label][f"{col}_is_drifted"] = str(round(df[col][test]['alert'].mean() * 100, 1)) + " % drifted"
 
         return my_dict
 
+    # calculator fitted on the current reference data, reused if the same reference was fitted before
+    def __fittedCalculator(self, methods):
+        key = None
+        calc = None
+        # the fingerprint hashes the whole reference, without a cache it would only add to the measured runtime
+        if self.calculators.max_entries:
+            key = (tuple(methods), tuple(self.column_names), frameFingerprint(self.ref))
+            calc = self.calculators.get(key)
+        if calc is None:
+            calc = nml.UnivariateDriftCalculator(
+                column_names=self.column_names,
+                timestamp_column_name='time',
+                continuous_methods=methods,
+                thresholds = {
+                    'kolmogorov_smirnov': nml.thresholds.StandardDeviationThreshold(std_lower_multiplier=None),
+                    'jensen_shannon':  nml.thresholds.ConstantThreshold(upper=0.1),
+                    'wasserstein':  nml.thresholds.StandardDeviationThreshold(std_lower_multiplier=None),
+                    'hellinger':  nml.thresholds.ConstantThreshold(upper=0.1),}
+            )
+            calc.fit(self.ref)
+            if key is not None:
+                self.calculators.put(key, calc)
+
+        return calc
+
+@registerTool
 class AlibiDetect(Tool):
-    def __init__(self, name):
+    packages = ('alibi-detect',)
+    # config: keyword arguments of the detectors per test, e.g. {'spotdiff': {'n_diffs': 2}}
+    # cache_size, cache_mb: number and memory budget of initialized detectors kept per (test, reference data, config),
+    # runs against an already seen reference only call predict (0: always initialize, as timed in the benchmark)
+    def __init__(self, name, config=None, cache_size=0, cache_mb=512):
         super().__init__(name)
+        self.config = config or {}
+        self.detectors = LRUCache(cache_size, max_bytes=cache_mb * 1024 ** 2)
         self.methods = {METHODS.KOLMOGOROV_SMIRNOV, METHODS.CVM, METHODS.SPOTDIFF}
 
+    def importBackend(self):
+        global KSDrift, CVMDrift, SpotTheDiffDrift
+        from alibi_detect.cd import KSDrift, CVMDrift, SpotTheDiffDrift
+
+    def settings(self):
+        return {'config': self.config}
+
     def preprocess(self):
         if 'prob_predicted' in self.ref:
             self.ref = self.ref.drop(columns={'predicted', 'prob_predicted'})
@@ -213,6 +402,8 @@ class AlibiDetect(Tool):
         self.cur = self.cur.to_numpy()
 
     def runDriftdetection(self, ref, cur, building_id):
+        self.loadBackend()
+        self.method_timings = {}
         self.ref = ref
         self.cur = cur
         self.preprocess()
@@ -220,11 +411,11 @@ class AlibiDetect(Tool):
         my_dict = {}
         for test in self.methods:
             if test == METHODS.KOLMOGOROV_SMIRNOV:
-                my_dict['K-S Test'] = self.__runDriftdetectiontest('kolmogorov_smirnov')
+                my_dict['K-S Test'] = self.timeMethod('K-S Test', self.__runDriftdetectiontest, 'kolmogorov_smirnov')
             elif test == METHODS.CVM:
-                my_dict['Cramer-von-Mises'] = self.__runDriftdetectiontest('cramer_von_mises')
+                my_dict['Cramer-von-Mises'] = self.timeMethod('Cramer-von-Mises', self.__runDriftdetectiontest, 'cramer_von_mises')
             elif test == METHODS.SPOTDIFF:
-                my_dict['Spot-the-diff'] = self.__runDriftdetectiontest('spotdiff')
+                my_dict['Spot-the-diff'] = self.timeMethod('Spot-the-diff', self.__runDriftdetectiontest, 'spotdiff')
 
         return my_dict
     
@@ -233,14 +424,14 @@ class AlibiDetect(Tool):
         my_dict = {}
 
         if test == 'kolmogorov_smirnov':
-            cd = KSDrift(x_ref = self.ref)
+            cd = self.__detector(test, KSDrift)
             report_dict = cd.predict(self.cur, drift_type='feature', return_p_val=True)
             for i in range(len(self.column_names)):
                 col = self.column_names[i]
                 my_dict[f"{col}_drift_score"] = report_dict['data']['p_val'][i]
                 my_dict[f"{col}_is_drifted"] = report_dict['data']['is_drift'][i]
         elif test == 'cramer_von_mises':
-            cd = CVMDrift(x_ref = self.ref)
+            cd = self.__detector(test, CVMDrift)
             report_dict = cd.predict(self.cur, drift_type='feature', return_p_val=True)
             for i in range(len(self.column_names)):
                 col = self.column_names[i]
@@ -248,7 +439,7 @@ class AlibiDetect(Tool):
                 my_dict[f"{col}_is_drifted"] = report_dict['data']['is_drift'][i]
         elif test == 'spotdiff':
             self.ref, self.cur = np.asarray(self.ref, np.float32), np.asarray(self.cur, np.float32)
-            cd = SpotTheDiffDrift(x_ref = self.ref)
+            cd = self.__detector(test, SpotTheDiffDrift)
             report_dict = cd.predict(self.cur, return_p_val=True)
             score = report_dict['data']['p_val']
             drifted = report_dict['data']['is_drift']
@@ -260,3 +451,259 @@ class AlibiDetect(Tool):
 
         return my_dict
 
+    # detector initialized on the current reference data, reused if the same reference and config were seen before
+    def __detector(self, test, detector_class):
+        config = self.config.get(test, {})
+        key = (test, arrayFingerprint(self.ref), repr(sorted(config.items())))
+        cd = self.detectors.get(key)
+        if cd is None:
+            cd = detector_class(x_ref = self.ref, **config)
+            # the detectors keep (a preprocessed copy of) the reference data, its size is used as memory estimate
+            self.detectors.put(key, cd, size=self.ref.nbytes)
+
+        return cd
+
+# reference implementation of the univariate methods directly on numpy arrays, all columns are tested at once
+@registerTool
+class Native(Tool):
+    packages = ('numpy', 'scipy')
+    # name in the report and statistic in Stats for every method, the names follow the Evidently stattests
+    tests = {METHODS.KOLMOGOROV_SMIRNOV: ('K-S Test', 'ks'), METHODS.WASSERSTEIN: ('Wasserstein Distanz', 'wasserstein'),
+             METHODS.KLD: ('K-L Divergence', 'kl_div'), METHODS.PSI: ('PSI', 'psi'), METHODS.JSD: ('J-S Distance', 'jensenshannon'),
+             METHODS.AD: ('Anderson-Darling', 'anderson'), METHODS.CVM: ('Cramer-von-Mises', 'cramer_von_mises'),
+             METHODS.HD: ('Hellinger-Distance', 'hellinger'), METHODS.MWURT: ('Mann-Whitney U-Rank Test', 'mannw'),
+             METHODS.ED: ('Energy-Distance', 'ed'), METHODS.ES: ('Epps-Singleton', 'es'), METHODS.TT: ('T-Test', 't_test')}
+
+    # cache_size: number of sorted references (Stats.ReferenceIndex) kept per reference data, repeated runs against the
+    # same reference (e.g. the windows of the STREAMING criterion) only sort the current data (0: always sort, as timed in the benchmark)
+    # sketch: True to compute the binned methods on bins fixed by the reference (Sketch.HistogramSketch, kept in the same
+    # cache) instead of the bins of reference and current data together, only the current data is binned per call
+    def __init__(self, name, cache_size=0, sketch=False):
+        super().__init__(name)
+        self.methods = set(self.tests)
+        self.indexes = LRUCache(cache_size)
+        self.sketch = sketch
+        self.sketches = LRUCache(cache_size)
+
+    def importBackend(self):
+        global Stats, Sketch
+        import Stats
+        import Sketch
+
+    def settings(self):
+        self.loadBackend()
+        return {'sketch': self.sketch, 'thresholds': Stats.THRESHOLDS}
+
+    def preprocess(self):
+        if 'prob_predicted' in self.ref:
+            self.ref = self.ref.drop(columns={'predicted', 'prob_predicted'})
+            self.cur = self.cur.drop(columns={'predicted', 'prob_predicted'})
+        if 'ids' in self.ref:
+            self.ref = self.ref.drop(columns={'ids'})
+            self.cur = self.cur.drop(columns={'ids'})
+        self.ref = self.ref.select_dtypes('number')
+        self.column_names = list(self.ref.columns)
+        self.ref = self.ref.to_numpy(dtype=float)
+        self.cur = self.cur[self.column_names].to_numpy(dtype=float)
+
+    def runDriftdetection(self, ref, cur, building_id):
+        self.loadBackend()
+        self.method_timings = {}
+        self.ref = ref
+        self.cur = cur
+        self.preprocess()
+
+        # sorting and histograms are shared between the methods
+        scores = self.timeMethod('batched', self.__driftScores, [self.tests[test][1] for test in self.methods])
+        return self.__report(scores)
+
+    # all buildings padded into one array and tested in one pass of the Stats kernels (Stats.batchedDriftScores),
+    # the binned methods use the bins of reference and current data together, with sketch the buildings run one by one
+    # on the bins fixed by their reference like runDriftdetection
+    def runDriftdetectionBatched(self, refs, curs, building_ids):
+        if self.sketch:
+            return super().runDriftdetectionBatched(refs, curs, building_ids)
+        self.loadBackend()
+        self.method_timings = {}
+        ref_samples, cur_samples = [], []
+        column_names = None
+        for ref, cur, building_id in zip(refs, curs, building_ids):
+            self.ref = ref
+            self.cur = cur
+            self.preprocess()
+            if column_names is not None and self.column_names != column_names:
+                raise ValueError("building {} has other columns than the first building".format(building_id))
+            column_names = self.column_names
+            ref_samples.append(self.ref)
+            cur_samples.append(self.cur)
+
+        ref, ref_mask = Stats.padBuildings(ref_samples)
+        cur, cur_mask = Stats.padBuildings(cur_samples)
+        scores = self.timeMethod('batched', Stats.batchedDriftScores, ref, cur, [self.tests[test][1] for test in self.methods],
+                                 ref_mask, cur_mask)
+        return {building_id: self.__report({stattest: (score[b], drifted[b]) for stattest, (score, drifted) in scores.items()})
+                for b, building_id in enumerate(building_ids)}
+
+    # {label: {f"{col}_drift_score", f"{col}_is_drifted"}} from the scores and decisions per column of every stattest
+    def __report(self, scores):
+        my_dict = {}
+        for test in self.methods:
+            label, stattest = self.tests[test]
+            score, drifted = scores[stattest]
+            my_dict[label] = {}
+            for i in range(len(self.column_names)):
+                col = self.column_names[i]
+                my_dict[label][f"{col}_drift_score"] = float(score[i])
+                my_dict[label][f"{col}_is_drifted"] = bool(drifted[i])
+
+        return my_dict
+
+    # the rank tests of the current data against the sorted reference, sorted on a miss of the cache
+    def __driftScores(self, tests):
+        key = None
+        index = None
+        sketch = None
+        # the fingerprint hashes the whole reference and the index sorts it, without a cache both would only add to the measured runtime
+        if self.indexes.max_entries:
+            key = arrayFingerprint(self.ref)
+            index = self.indexes.get(key)
+            if index is None:
+                index = Stats.ReferenceIndex(self.ref)
+                self.indexes.put(key, index, size=index.nbytes)
+        if not self.sketch:
+            return Stats.driftScores(self.ref, self.cur, tests, index)
+
+        binned = Stats.BINNED_TESTS & set(tests)
+        if key is not None:
+            sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = Sketch.HistogramSketch(self.ref)
+            if key is not None:
+                self.sketches.put(key, sketch, size=2 * sketch.ref_counts.nbytes)
+        sketch.reset()
+        sketch.add(self.cur)
+        scores = Stats.driftScores(self.ref, self.cur, [test for test in tests if test not in binned], index)
+        scores.update(sketch.scores(binned))
+        return scores
+
+
+# bounded memory drift detection on KLL quantile sketches (Sketch.py) of reference and current data, both are DataFrames read
+# in chunks of chunk_size rows or iterables of chunks (e.g. pd.read_csv(..., chunksize=...)) that are never loaded as a whole,
+# so the memory of the tool does not grow with the length of the streams
+# the scores are approximations, the bound of every statistic (KS distance, normed Wasserstein distance, PSI)
+# of the last call is kept in error_bounds: {label: {column: bound}}
+# the K-S score is the KS distance and not its p-value (the p-value of a distance that is off by the bound means nothing for
+# large streams), drifted if the distance exceeds the critical distance of the K-S test (Stats.ksCritical) by more than the bound
+# is_drifted is True or False only if the whole range of the statistic (score +- bound, for the PSI the range of
+# Sketch.psiRange) lies on one side of the threshold and None (undecided) otherwise, e.g. a Wasserstein distance of
+# 0.12 +- 0.05 is undecided for the threshold 0.1, a larger k gives smaller bounds
+@registerTool
+class StreamingSketch(Tool):
+    packages = ('numpy', 'scipy')
+    tests = {METHODS.KOLMOGOROV_SMIRNOV: 'K-S Test', METHODS.WASSERSTEIN: 'Wasserstein Distanz', METHODS.PSI: 'PSI'}
+
+    # k: accuracy of the sketches (cdf error 1.7 % for k = 200, see Sketch.rankError)
+    # references: sketches of the reference data by building id (Sketch.FrameSketch or its state()), e.g. built once from
+    # the whole history and shipped to the workers, the reference data of these buildings is not read
+    # cache_size: number of sketches built from the reference data that are kept per reference (0: always build, as timed in the benchmark)
+    def __init__(self, name, k=200, chunk_size=10000, references=None, cache_size=0):
+        super().__init__(name)
+        self.k = k
+        self.chunk_size = chunk_size
+        self.references = dict(references or {})
+        self.sketches = LRUCache(cache_size)
+        self.methods = set(self.tests)
+        self.error_bounds = {}
+
+    def importBackend(self):
+        global Stats, Sketch
+        import Stats
+        import Sketch
+
+    # the prebuilt reference sketches are part of the settings, results of buildings without one depend on the data only
+    def settings(self):
+        self.loadBackend()
+        references = {building_id: sketch.state() if isinstance(sketch, Sketch.FrameSketch) else sketch
+                      for building_id, sketch in self.references.items()}
+        return {'k': self.k, 'chunk_size': self.chunk_size, 'thresholds': Stats.THRESHOLDS, 'references': references}
+
+    # the columns are taken from the first chunk of the current data (self.cur), only these columns are sketched
+    def preprocess(self):
+        dropped = {'ids'}
+        if 'prob_predicted' in self.cur:
+            dropped |= {'predicted', 'prob_predicted'}
+        self.column_names = [col for col in self.cur.select_dtypes('number').columns if col not in dropped]
+
+    # DataFrames are cut into chunks of chunk_size rows (at least one, for the columns), anything else is an iterable of chunks
+    def chunks(self, data):
+        if isinstance(data, pd.DataFrame):
+            return (data.iloc[start:start + self.chunk_size] for start in range(0, max(len(data), 1), self.chunk_size))
+        return iter(data)
+
+    # ref is not read for buildings in references
+    def runDriftdetection(self, ref, cur, building_id):
+        self.loadBackend()
+        self.method_timings = {}
+        self.ref = ref
+        chunks = self.chunks(cur)
+        self.cur = next(chunks, None)
+        if self.cur is None:
+            raise ValueError("no current data for building {}".format(building_id))
+        self.preprocess()
+
+        ref_sketch = self.timeMethod('sketch reference', self.__referenceSketch, building_id)
+        cur_sketch = self.timeMethod('sketch current', self.__sketch, itertools.chain([self.cur], chunks))
+        self.error_bounds = {}
+        my_dict = {}
+        for test in self.methods:
+            label = self.tests[test]
+            my_dict[label] = self.timeMethod(label, self.__runDriftdetectiontest, ref_sketch, cur_sketch, test)
+
+        return my_dict
+
+    def __runDriftdetectiontest(self, ref_sketch, cur_sketch, test):
+        label = self.tests[test]
+        self.error_bounds[label] = {}
+        my_dict = {}
+        for col in self.column_names:
+            ref, cur = ref_sketch.sketches[col], cur_sketch.sketches[col]
+            if test == METHODS.KOLMOGOROV_SMIRNOV:
+                score, bound = Sketch.ksDistance(ref, cur)
+                low, high = score - bound, score + bound
+                threshold = float(Stats.ksCritical(np.array([ref.n]), np.array([cur.n]))[0])
+            elif test == METHODS.WASSERSTEIN:
+                score, bound = Sketch.wassersteinDistance(ref, cur)
+                low, high = score - bound, score + bound
+                threshold = Stats.THRESHOLDS['wasserstein']
+            elif test == METHODS.PSI:
+                score, low, high = Sketch.psiRange(ref, cur)
+                bound = max(high - score, score - low)
+                threshold = Stats.THRESHOLDS['psi']
+            self.error_bounds[label][col] = bound
+            my_dict[f"{col}_drift_score"] = score
+            my_dict[f"{col}_is_drifted"] = Sketch.isDrifted(low, high, threshold)
+
+        return my_dict
+
+    # the sketch of a building given in references, otherwise built from the reference data on a miss of the cache
+    # (only DataFrames are cached, chunks of a reader can only be read once)
+    def __referenceSketch(self, building_id):
+        sketch = self.references.get(building_id)
+        if isinstance(sketch, dict):
+            sketch = self.references[building_id] = Sketch.FrameSketch.fromState(sketch)
+        if sketch is not None:
+            return sketch
+        if not self.sketches.max_entries or not isinstance(self.ref, pd.DataFrame):
+            return self.__sketch(self.chunks(self.ref))
+        key = frameFingerprint(self.ref[self.column_names])
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.__sketch(self.chunks(self.ref))
+            self.sketches.put(key, sketch)
+        return sketch
+
+    def __sketch(self, chunks):
+        sketch = Sketch.FrameSketch(self.column_names, self.k)
+        for chunk in chunks:
+            sketch.update(chunk)
+        return sketch
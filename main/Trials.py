@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+
+# environment variable with the file the per-sample measurements of a cold run are appended to, set by runCold
+SAMPLES_ENV = 'D3BENCH_SAMPLES'
+
+# median, p90, p99, standard deviation and a bootstrap confidence interval of the median of the samples
+def summarize(samples, confidence=0.95, resamples=1000, seed=0):
+    x = np.asarray(samples, dtype=float)
+    x = x[~np.isnan(x)]
+    if len(x) == 0:
+        return {'median': np.nan, 'p90': np.nan, 'p99': np.nan, 'std': np.nan, 'ci_low': np.nan, 'ci_high': np.nan}
+
+    rng = np.random.default_rng(seed)
+    medians = np.median(x[rng.integers(0, len(x), (resamples, len(x)))], axis=1)
+    alpha = (1 - confidence) / 2 * 100
+    return {
+        'median': float(np.median(x)),
+        'p90': float(np.percentile(x, 90)),
+        'p99': float(np.percentile(x, 99)),
+        'std': float(np.std(x, ddof=1)) if len(x) > 1 else 0.0,
+        'ci_low': float(np.percentile(medians, alpha)),
+        'ci_high': float(np.percentile(medians, 100 - alpha)),
+    }
+
+def formatSummary(summary, unit):
+    return "median {:.4f} {unit}, p90 {:.4f} {unit}, p99 {:.4f} {unit}, std {:.4f} {unit}, CI [{:.4f}, {:.4f}] {unit}".format(
+        summary['median'], summary['p90'], summary['p99'], summary['std'], summary['ci_low'], summary['ci_high'], unit=unit)
+
+def isColdChild():
+    return SAMPLES_ENV in os.environ
+
+# appends the per-sample measurements of a benchmark to the samples file of the cold run (does nothing outside a cold run)
+def dumpSamples(benchmark):
+    path = os.environ.get(SAMPLES_ENV)
+    if not path:
+        return
+    with open(path, 'a') as f:
+        for sample in benchmark.samples:
+            f.write(json.dumps(dict(sample, tool=benchmark.tool.name, showReport=benchmark.tool.showReport)) + '\n')
+
+# runs the script in a fresh process per trial, so every trial pays reading the data, imports and first calls again,
+# and summarizes the samples of all trials per tool
+def runCold(script, trials):
+    with tempfile.NamedTemporaryFile(suffix='.jsonl', delete=False) as f:
+        path = f.name
+    try:
+        env = dict(os.environ)
+        env[SAMPLES_ENV] = path
+        for trial in range(trials):
+            subprocess.run([sys.executable, script], env=env, check=True)
+
+        samples = {}
+        with open(path) as f:
+            for line in f:
+                sample = json.loads(line)
+                name = sample['tool'] + (" with report" if sample['showReport'] else "")
+                samples.setdefault(name, []).append(sample)
+    finally:
+        os.remove(path)
+
+    print("==============================")
+    print("Cold process trials: {}".format(trials))
+    for name, tool_samples in samples.items():
+        print("Tool: {}".format(name))
+        print("Runtime: " + formatSummary(summarize([s['runtime'] for s in tool_samples]), 'ms'))
+        print("CPU Runtime: " + formatSummary(summarize([s['cpu_runtime'] for s in tool_samples]), 'ms'))
+        print("RAM Peak: " + formatSummary(summarize([s['ram_peak'] for s in tool_samples]), 'MiB'))
+    print("==============================")
+    return samples
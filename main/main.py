@@ -1,9 +1,16 @@
 import Benchmark
 from Benchmark import Criteria
+import Scheduler
+import Results
+import Trials
 from Tool import Evidently
 from Tool import AlibiDetect
 from Tool import NannyML
+from Tool import Native
+from Tool import StreamingSketch
+from Tool import printImportReport
 import Dataset
+from Cache import ResultCache
 from Dataset import Data_Occupacy
 from Dataset import Data_Energy
 import os
@@ -15,43 +22,141 @@ def main():
     # 1. select dataset: True if you want to investigate energy dataset, False if you want to investigate Occupacy dataset
     energy = False 
 
-    # 2. select the tools
+    # 2. select the tools (Evidently("Evidently", False, batched=True) computes all stattests in one report per building,
+    #    Native("Native", cache_size=4) keeps the sorted reference between calls, e.g. for the windows of Criteria.STREAMING,
+    #    Native("Native", sketch=True) bins the current data on histograms fixed by the reference,
+    #    StreamingSketch("StreamingSketch") approximates K-S, Wasserstein and PSI on quantile sketches in bounded memory)
     tools = {Evidently("Evidently", False), Evidently("Evidently", True),
               NannyML("NannyML", False), NannyML("NannyML", True), 
-              AlibiDetect("AlibiDetect")} 
+              AlibiDetect("AlibiDetect"), Native("Native"), StreamingSketch("StreamingSketch")} 
 
-    # 3. select criteria
+    # 3. select criteria (Criteria.SCALABILITY additionally replays the tools on resampled data of growing size, see 10.,
+    #    Criteria.STREAMING feeds the current data in micro-batches, see 11., Criteria.CONCURRENCY calls the tools from
+    #    concurrent threads, see 12., Criteria.STARTUP measures the import and first calls in a fresh process, see 13.,
+    #    Criteria.PROFILE samples the stacks of every measured call for flamegraphs, see 14.)
     criteria = [Criteria.FUNCTIONAL, Criteria.RUNTIME, Criteria.CPU_RUNTIME, Criteria.STORAGE]
 
     # 4. select if run on vm: True if run on vm, False if run locally
     vm = False
 
+    # 5. select if every criterion runs in its own pass: True for one call per criterion and building, False to measure all criteria
+    #    in a single pass with warmup and trials (the memory of every trial is measured in a second, untimed call)
+    isolated = False
+
+    # 6. select the folder for cached preprocessed datasets: None to read and preprocess the csv on every start
+    cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache')
+
+    # 7. select the number of worker processes for the (tool, building) runs: 1 runs serially, None uses all cpus
+    #    and if every worker is pinned to its own cpu
+    workers = 1
+    pin_cpus = False
+
+    # 8. select the number of unmeasured warmup runs and measured trials per tool and building
+    #    and if every trial runs in a fresh process (cold: pays data loading, imports and first calls again)
+    warmup = 1
+    trials = 5
+    cold = False
+
+    # 9. select the memory sampler (see Memory.py): 'rss' polls the resident memory in a background thread every interval seconds,
+    #    'tracemalloc' traces the python heap peaks, 'maxrss' reports the growth of the maximum resident memory
+    memory = 'rss'
+    memory_options = {'interval': 0.001}
+
+    # 10. select the sweep of Criteria.SCALABILITY: row counts at the native columns, column counts at base_rows rows
+    #     and the seconds a point may take before the larger points are skipped
+    scaling = {'rows': [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7], 'columns': [2, 8, 32, 128, 256],
+               'base_rows': 1000, 'budget': 300}
+
+    # 11. select the micro-batches of Criteria.STREAMING: rows per window (hourly data: day, week, 30 days),
+    #     rows between two windows (None: tumbling windows) and the maximal number of windows per building (None: all, one call
+    #     per window)
+    streaming = {'windows': [24, 168, 720], 'step': None, 'max_windows': 50}
+
+    # 12. select the load of Criteria.CONCURRENCY: numbers of concurrent workers, calls per number of workers
+    #     and if the calls come from a thread pool and/or an asyncio event loop
+    concurrency = {'workers': [1, 2, 4, 8], 'calls': 32, 'modes': ['threads', 'asyncio']}
+
+    # 13. select the drift detection calls after the cold import of Criteria.STARTUP (one fresh process per trial, see 8.)
+    #     and the number of slowest imported modules reported
+    startup = {'calls': 5, 'modules': 10}
+
+    # 14. select the sampling interval (seconds) of Criteria.PROFILE and the number of hotspots reported per method
+    profile = {'interval': 0.005, 'top': 10}
+
+    # 15. select the SQLite results store every run is appended to (None for no store)
+    #     and if the csv reports (benchmark_report.csv, benchmark_streaming.csv, ...) and the collapsed stacks of Criteria.PROFILE
+    #     are written as well
+    results_db = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'results.db')
+    csv_report = False
+
+    # 16. select the folder of cached drift results (None: always run the tools) and its size bound in MiB, results of the same
+    #     tool, version, settings and data are reused by Criteria.FUNCTIONAL when it runs on its own (isolated or without timing
+    #     criteria), the timed runs always call the tools
+    result_cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'result_cache')
+    result_cache_mb = 256
+
     # finished
     #####################################
 
+    if cold:
+        if not Trials.isColdChild():
+            Trials.runCold(os.path.abspath(__file__), trials)
+            return
+        warmup, trials = 0, 1
+
     if energy:
         path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'energy_data.csv')
-        dataset= Data_Energy(path)
+        dataset= Data_Energy(path, cache_dir)
 
     else:
         path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'occupacy_data.csv')
-        dataset = Data_Occupacy(path)
+        dataset = Data_Occupacy(path, cache_dir)
 
-    runBenchmark(buildings={1}, tests=criteria, tools=tools, vm = vm, dataset=dataset)
+    store = None
+    run_id = None
+    if results_db is not None:
+        store = Results.ResultStore(results_db)
+        run_id = store.startRun(vm, config={'dataset': os.path.basename(path), 'tools': sorted(tool.name for tool in tools),
+                                            'criteria': [criterion.name for criterion in criteria], 'isolated': isolated,
+                                            'workers': workers, 'warmup': warmup, 'trials': trials, 'memory': memory})
+        print("Run {} is stored in {}".format(run_id, results_db))
+
+    result_cache = ResultCache(result_cache_dir, result_cache_mb) if result_cache_dir is not None else None
+
+    runBenchmark(buildings={1}, tests=criteria, tools=tools, vm = vm, dataset=dataset, isolated=isolated,
+                 workers=workers, pin_cpus=pin_cpus, warmup=warmup, trials=trials,
+                 memory=memory, memory_options=memory_options, scaling=scaling,
+                 streaming=streaming, concurrency=concurrency, startup=startup, profile=profile, store=store, run_id=run_id, csv_report=csv_report,
+                 result_cache=result_cache)
+    if store is not None:
+        store.close()
+    printImportReport()
     print("---------Benchmark execution finished---------")
 
 # one benchmark execution with given criteria, tools and dataset
 def runBenchmark(buildings = {1}, tests=[Criteria.FUNCTIONAL, Criteria.RUNTIME, Criteria.CPU_RUNTIME, Criteria.STORAGE],
                   tools={(Evidently("Evidently", showReport=False))}, vm = False, 
-                  dataset=Data_Energy(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'energy_data.csv'))):
-    for tool in tools:
-        benchmark = Benchmark.Benchmark(tool, dataset, tests, buildings, vm)
-        benchmark.runBenchmark()
+                  dataset=None, isolated=False, workers=1, pin_cpus=False, warmup=0, trials=1,
+                  memory='rss', memory_options=None, scaling=None, streaming=None,
+                  concurrency=None, startup=None, profile=None, store=None, run_id=None, csv_report=True, result_cache=None):
+    if dataset is None:
+        dataset = Data_Energy(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'energy_data.csv'))
+    benchmarks = [Benchmark.Benchmark(tool, dataset, tests, buildings, vm, isolated, warmup, trials, memory, memory_options, scaling, streaming,
+                                  concurrency, startup, profile, store, run_id, csv_report, result_cache) for tool in tools]
+
+    if workers == 1:
+        for benchmark in benchmarks:
+            benchmark.runBenchmark()
+    else:
+        # measure all (tool, building) units in worker processes, then report every tool as before
+        measurements = Scheduler.runParallel(benchmarks, workers, pin_cpus)
+        for benchmark, measurement in zip(benchmarks, measurements):
+            benchmark.runBenchmark(measurement)
 
 # delete all reports
 def clean():
     tests = {'kolmogorov_smirnov', 'anderson', 'cramer_von_mises', 'ed', 'es', 'hellinger', 'jensenshannon', 
-             'kl_div', 'mannw', 'psi', 't_test', 'wasserstein', 'jensen_shannon'}
+             'kl_div', 'mannw', 'psi', 't_test', 'wasserstein', 'jensen_shannon', 'batched'}
     for i in range(1, 37):
         for test in tests:
             file_name = "evidently_report_{}_{}.html".format(i, test)
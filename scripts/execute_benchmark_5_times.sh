@@ -1,7 +1,5 @@
 #!/bin/bash
 
-# Loop to execute main.py 5 times
-for i in {1..5}
-do
-    python3 ../main/main.py
-done
+# main.py repeats the measurements itself: the number of warmup runs and trials
+# (and cold trials in fresh processes) are selected in the config block of main.py
+python3 ../main/main.py
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+from Cache import LRUCache, ResultCache, arrayFingerprint
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert (cache.hits, cache.misses, cache.evictions) == (3, 1, 1)
+
+def test_lru_memory_budget():
+    cache = LRUCache(max_entries=10, max_bytes=100)
+    cache.put('a', 1, size=60)
+    cache.put('b', 2, size=30)
+    # replacing an entry counts its new size only
+    cache.put('b', 3, size=40)
+    assert cache.bytes == 100 and len(cache.entries) == 2
+    cache.put('c', 4, size=10)
+    assert list(cache.entries) == ['b', 'c'] and cache.bytes == 50
+    # an entry above the budget is not kept at all
+    cache.put('d', 5, size=200)
+    assert len(cache.entries) == 0 and cache.bytes == 0
+
+def test_lru_disabled():
+    cache = LRUCache(0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
+
+def test_result_cache_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), max_mb=1)
+    value = np.zeros(40000) # 320 kB pickled
+    keys = [ResultCache.key('run', i) for i in range(3)]
+    for age, key in zip([30, 20, 10], keys):
+        cache.put(key, value)
+        os.utime(cache.file(key), (0, 1e9 - age))
+    # a read refreshes the entry, so the oldest unread entry is evicted first
+    assert cache.get(keys[0]) is not None
+    cache.put(ResultCache.key('run', 3), value)
+    cache.put(ResultCache.key('run', 4), value)
+    remaining = {key for key in keys if os.path.exists(cache.file(key))}
+    assert keys[0] in remaining and keys[1] not in remaining
+    assert cache.evictions == 2
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= cache.max_bytes
+
+def test_result_cache_drops_broken_entries(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = ResultCache.key('broken')
+    with open(cache.file(key), 'wb') as f:
+        f.write(b'not a pickle')
+    assert cache.get(key) is None
+    assert not os.path.exists(cache.file(key)) and cache.misses == 1
+
+def test_array_fingerprint():
+    arr = np.random.default_rng(0).normal(size=(50000, 3))
+    changed = arr.copy()
+    changed[12345, 1] += 1
+    assert arrayFingerprint(arr) == arrayFingerprint(arr.copy())
+    assert arrayFingerprint(arr) != arrayFingerprint(changed)
+    assert arrayFingerprint(arr) != arrayFingerprint(arr.reshape(3, 50000))
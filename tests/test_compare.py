@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+import Compare
+import Results
+
+def measurements(groups):
+    return pd.DataFrame([{'tool': 'Native', 'show_report': 0, 'method': method, 'building': 1, 'runtime': value,
+                          'cpu_runtime': value, 'ram_peak': np.nan}
+                         for method, values in groups.items() for value in values])
+
+def verdicts(diff):
+    return dict(zip(diff['method'] + '/' + diff['metric'], diff['verdict']))
+
+def test_min_pvalue():
+    assert Compare.minPvalue(1, 1) == 1.0
+    assert Compare.minPvalue(3, 3) == pytest.approx(0.1)
+    assert Compare.minPvalue(5, 5) == pytest.approx(2 / 252)
+    # completely separated samples reach the smallest p-value of the exact test
+    x, y = np.arange(5.0), np.arange(5.0) + 10
+    assert stats.mannwhitneyu(x, y, alternative='two-sided', method='exact').pvalue == pytest.approx(Compare.minPvalue(5, 5))
+
+def test_verdicts():
+    baseline = measurements({'slower': [1.0, 1.01, 1.02, 1.03, 1.04], 'faster': [2.0, 2.01, 2.02, 2.03, 2.04],
+                             'same': [1.0, 1.2, 1.1, 1.3, 1.05], 'few': [1.0, 1.1, 1.2], 'gone': [1.0, 1.1]})
+    candidate = measurements({'slower': [2.0, 2.01, 2.02, 2.03, 2.04], 'faster': [1.0, 1.01, 1.02, 1.03, 1.04],
+                              'same': [1.01, 1.21, 1.11, 1.31, 1.06], 'few': [2.0, 2.1, 2.2]})
+    diff = Compare.compareRuns(baseline, candidate, metrics=['runtime', 'ram_peak'])
+    assert verdicts(diff) == {'slower/runtime': 'regression', 'faster/runtime': 'improvement', 'same/runtime': '',
+                              'few/runtime': 'too few samples', 'gone/runtime': 'missing'}
+    # metrics without baseline samples are not compared
+    assert (diff['metric'] == 'runtime').all()
+
+def test_small_threshold_change_is_no_regression():
+    baseline = measurements({'all': [1.0, 1.001, 1.002, 1.003, 1.004, 1.005]})
+    candidate = measurements({'all': [1.01, 1.011, 1.012, 1.013, 1.014, 1.015]})
+    diff = Compare.compareRuns(baseline, candidate, threshold=0.05, metrics=['runtime'])
+    assert list(diff['verdict']) == ['']
+
+def test_exit_code():
+    diff = pd.DataFrame({'verdict': ['', 'too few samples', 'missing']})
+    assert Compare.exitCode(diff) == 2
+    assert Compare.exitCode(diff, ['missing']) == 2
+    assert Compare.exitCode(diff[diff['verdict'] != 'missing'], ['missing']) == 0
+    assert Compare.exitCode(diff, []) == 0
+    assert Compare.exitCode(pd.DataFrame({'verdict': ['regression', 'missing']}), []) == 1
+
+def test_main(tmp_path):
+    path = str(tmp_path / 'results.db')
+    store = Results.ResultStore(path)
+    for values in ([1.0, 1.01, 1.02, 1.03, 1.04], [2.0, 2.01, 2.02, 2.03, 2.04]):
+        run_id = store.startRun()
+        store.addMeasurements(run_id, 'Native', False, [{'building': 1, 'trial': trial, 'method': 'all', 'runtime': value}
+                                                       for trial, value in enumerate(values)])
+    store.close()
+    assert Compare.main(['previous', 'latest', '--db', path, '--metrics', 'runtime']) == 1
+    assert Compare.main(['latest', 'previous', '--db', path, '--metrics', 'runtime']) == 0
@@ -0,0 +1,102 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+import Sketch
+import Stats
+from Tool import StreamingSketch
+
+def sketchOf(values, k=200, seed=0):
+    sketch = Sketch.QuantileSketch(k, seed)
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+    return sketch
+
+# PSI of the exact shares in the bins of the sketch (share of the values below each inner edge, as Sketch.psi)
+def exactPsi(ref, cur, ref_sketch, bins=10):
+    if ref_sketch.error():
+        bins = max(2, min(bins, int(1 / (4 * ref_sketch.error()))))
+    inner = np.unique(ref_sketch.quantile(np.arange(1, bins) / bins))
+    inner = inner[inner > ref_sketch.min]
+    shares = lambda x: np.diff(np.concatenate([[0], np.searchsorted(np.sort(x), inner, 'left') / len(x), [1]]))
+    return float(np.sum(Sketch.psiTerms(shares(ref), shares(cur))))
+
+@pytest.mark.parametrize('shift', [0.0, 0.05, 0.3])
+def test_bounds_contain_exact_values(shift):
+    rng = np.random.default_rng(7)
+    ref_values, cur_values = rng.normal(size=50000), rng.normal(shift, 1.2, size=30000)
+    ref, cur = sketchOf(ref_values), sketchOf(cur_values, seed=1)
+    assert ref.error() > 0 and cur.error() > 0
+
+    d, bound = Sketch.ksDistance(ref, cur)
+    assert abs(d - stats.ks_2samp(ref_values, cur_values).statistic) <= bound
+    w, bound = Sketch.wassersteinDistance(ref, cur)
+    assert abs(w - stats.wasserstein_distance(ref_values, cur_values) / np.std(ref_values)) <= bound
+    value, bound = Sketch.psi(ref, cur)
+    exact = exactPsi(ref_values, cur_values, ref)
+    assert abs(value - exact) <= bound
+    value, lower, upper = Sketch.psiRange(ref, cur)
+    assert lower <= exact <= upper
+
+def test_exact_without_compaction():
+    rng = np.random.default_rng(1)
+    ref_values, cur_values = rng.normal(size=100), rng.normal(0.5, size=80)
+    ref, cur = sketchOf(ref_values, k=1000), sketchOf(cur_values, k=1000)
+    d, bound = Sketch.ksDistance(ref, cur)
+    assert bound == 0
+    assert d == pytest.approx(stats.ks_2samp(ref_values, cur_values).statistic)
+    w, bound = Sketch.wassersteinDistance(ref, cur)
+    assert w == pytest.approx(stats.wasserstein_distance(ref_values, cur_values) / np.std(ref_values))
+
+def test_is_drifted():
+    assert Sketch.isDrifted(0.25, 0.35, 0.1) is True
+    assert Sketch.isDrifted(0.1, 0.2, 0.1) is True
+    assert Sketch.isDrifted(0.0, 0.07, 0.1) is False
+    assert Sketch.isDrifted(0.07, 0.17, 0.1) is None
+    assert Sketch.isDrifted(np.nan, np.nan, 0.1) is None
+
+def test_ks_critical():
+    n, m = np.array([50, 400, 3000]), np.array([40, 500, 2000])
+    critical = Stats.ksCritical(n, m)
+    assert np.allclose(Stats.ksPvalue(critical, n, m), Stats.THRESHOLDS['ks'])
+    assert np.all(Stats.ksPvalue(critical * 1.01, n, m) < Stats.THRESHOLDS['ks'])
+
+def test_merge():
+    rng = np.random.default_rng(3)
+    values = rng.exponential(size=40000)
+    merged = sketchOf(values[:25000]).merge(sketchOf(values[25000:], seed=5))
+    assert merged.n == len(values)
+    assert merged.mean == pytest.approx(values.mean())
+    assert merged.std() == pytest.approx(values.std())
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    grid = np.quantile(values, np.linspace(0.01, 0.99, 50))
+    exact = np.searchsorted(np.sort(values), grid, 'right') / len(values)
+    assert np.max(np.abs(merged.cdf(grid) - exact)) <= merged.error()
+
+def test_state_round_trip():
+    rng = np.random.default_rng(4)
+    frame = pd.DataFrame({'a': rng.normal(size=20000), 'b': rng.uniform(size=20000)})
+    sketch = Sketch.FrameSketch(['a', 'b'])
+    sketch.update(frame)
+    state = json.loads(json.dumps(sketch.state()))
+    copy = Sketch.FrameSketch.fromState(state)
+    assert copy.state() == sketch.state()
+    for col in ['a', 'b']:
+        grid = np.linspace(frame[col].min(), frame[col].max(), 20)
+        assert np.array_equal(copy.sketches[col].cdf(grid), sketch.sketches[col].cdf(grid))
+        assert copy.sketches[col].error() == sketch.sketches[col].error()
+
+def test_streaming_sketch_decisions():
+    rng = np.random.default_rng(5)
+    ref = pd.DataFrame({'same': rng.normal(size=30000), 'shifted': rng.normal(size=30000)})
+    cur = pd.DataFrame({'same': rng.normal(size=20000), 'shifted': rng.normal(2, size=20000)})
+    tool = StreamingSketch('StreamingSketch')
+    result = tool.runDriftdetection(ref, cur, 1)
+    for label in tool.tests.values():
+        assert result[label]['shifted_is_drifted'] is True
+        assert result[label]['same_is_drifted'] in (False, None)
+        assert set(tool.error_bounds[label]) == {'same', 'shifted'}
+    # the K-S score is the distance, not a p-value
+    assert result['K-S Test']['shifted_drift_score'] == pytest.approx(
+        stats.ks_2samp(ref['shifted'], cur['shifted']).statistic, abs=tool.error_bounds['K-S Test']['shifted'])
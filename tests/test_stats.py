@@ -0,0 +1,76 @@
+import warnings
+import numpy as np
+import pytest
+from scipy import stats
+from scipy.spatial.distance import jensenshannon
+import Stats
+
+def samples(seed=1, n=700, m=450):
+    rng = np.random.default_rng(seed)
+    # continuous, tied, discrete and skewed columns with missing values
+    ref = np.column_stack([rng.normal(size=n), np.round(rng.normal(size=n), 1), rng.integers(0, 5, n).astype(float),
+                           rng.exponential(size=n)])
+    cur = np.column_stack([rng.normal(0.1, size=m), np.round(rng.normal(0.2, 1.1, size=m), 1),
+                           rng.integers(0, 6, m).astype(float), rng.exponential(1.3, size=m)])
+    ref[rng.random(n) < 0.05, 3] = np.nan
+    cur[rng.random(m) < 0.05, 0] = np.nan
+    return ref, cur
+
+# the scipy statistic (or p-value) of every test in Stats.THRESHOLDS for one column without missing values
+def scipyScores(r, c):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = {'ks': stats.ks_2samp(r, c, method='asymp').pvalue,
+                    'wasserstein': stats.wasserstein_distance(r, c) / max(np.std(r), 0.001),
+                    'ed': stats.energy_distance(r, c),
+                    'anderson': stats.anderson_ksamp([r, c]).pvalue,
+                    'cramer_von_mises': stats.cramervonmises_2samp(r, c, method='asymptotic').pvalue,
+                    'mannw': stats.mannwhitneyu(r, c, alternative='two-sided', method='asymptotic').pvalue,
+                    'es': stats.epps_singleton_2samp(r, c).pvalue,
+                    't_test': stats.ttest_ind(r, c).pvalue}
+    # Sturges bins of both samples with the floor of empty bins, as the Evidently stattests
+    edges = np.histogram_bin_edges(np.r_[r, c], bins='sturges')
+    p = np.histogram(r, edges)[0] / len(r)
+    q = np.histogram(c, edges)[0] / len(c)
+    p[p == 0] = 0.0001
+    q[q == 0] = 0.0001
+    expected['psi'] = np.sum((p - q) * np.log(p / q))
+    expected['kl_div'] = stats.entropy(p, q)
+    expected['jensenshannon'] = jensenshannon(p, q)
+    expected['hellinger'] = np.sqrt(np.sum((np.sqrt(p / p.sum()) - np.sqrt(q / q.sum())) ** 2)) / np.sqrt(2)
+    return expected
+
+def test_kernels_match_scipy():
+    ref, cur = samples()
+    scores = Stats.driftScores(ref, cur, Stats.THRESHOLDS)
+    for j in range(ref.shape[1]):
+        r, c = ref[~np.isnan(ref[:, j]), j], cur[~np.isnan(cur[:, j]), j]
+        for test, expected in scipyScores(r, c).items():
+            score, drifted = scores[test]
+            assert score[j] == pytest.approx(expected, rel=1e-6), (j, test)
+            assert drifted[j] == Stats.isDrifted(test, expected)
+
+def test_reference_index_matches_pooled():
+    ref, cur = samples(2)
+    index = Stats.ReferenceIndex(ref)
+    tests = sorted(Stats.INDEX_TESTS)
+    indexed = Stats.driftScores(ref, cur, tests, index)
+    pooled = Stats.driftScores(ref, cur, tests)
+    for test in tests:
+        assert np.allclose(indexed[test][0], pooled[test][0], rtol=1e-9, equal_nan=True), test
+
+def test_batched_matches_per_building():
+    rng = np.random.default_rng(3)
+    refs = [samples(seed, n, m)[0] for seed, n, m in [(4, 300, 200), (5, 120, 90), (6, 50, 80)]]
+    curs = [cur + rng.normal(0, 0.1, cur.shape) for cur in (samples(7, 60, 200)[1], samples(8, 40, 90)[1], samples(9, 10, 80)[1])]
+    ref, ref_mask = Stats.padBuildings(refs)
+    cur, cur_mask = Stats.padBuildings(curs)
+    tests = sorted(Stats.THRESHOLDS)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        batched = Stats.batchedDriftScores(ref, cur, tests, ref_mask, cur_mask)
+        for b in range(len(refs)):
+            single = Stats.driftScores(refs[b], curs[b], tests)
+            for test in tests:
+                assert np.allclose(batched[test][0][b], single[test][0], rtol=1e-9, equal_nan=True), (b, test)
+                assert np.array_equal(batched[test][1][b], single[test][1]), (b, test)